@@ -0,0 +1,26 @@
+# Generated by Django 4.2.8 on 2026-10-15 15:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("music", "0001_initial"),
+        ("activities", "0019_alter_postattachment_focal_x_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="timelineevent",
+            name="subject_playlist",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="timeline_events",
+                to="music.playlist",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.8 on 2026-10-15 15:24
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("activities", "0020_timelineevent_subject_playlist"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="timelineevent",
+            index=models.Index(
+                fields=["subject_playlist"], name="ix_timeline_subject_playlist"
+            ),
+        ),
+    ]
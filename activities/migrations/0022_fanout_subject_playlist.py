@@ -0,0 +1,36 @@
+# Generated by Django 4.2.8 on 2026-10-15 15:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("music", "0001_initial"),
+        ("activities", "0021_timelineevent_subject_playlist_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fanout",
+            name="subject_playlist",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="fan_outs",
+                to="music.playlist",
+            ),
+        ),
+        migrations.AddField(
+            model_name="fanout",
+            name="subject_playlist_interaction",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="fan_outs",
+                to="music.playlistinteraction",
+            ),
+        ),
+    ]
@@ -3,5 +3,9 @@ from .fan_out import FanOut, FanOutStates  # noqa
 from .hashtag import Hashtag, HashtagStates  # noqa
 from .post import Post, PostStates  # noqa
 from .post_attachment import PostAttachment, PostAttachmentStates  # noqa
-from .post_interaction import PostInteraction, PostInteractionStates  # noqa
+from .post_interaction import (  # noqa
+    PostInteraction,
+    PostInteractionsDict,
+    PostInteractionStates,
+)
 from .timeline_event import TimelineEvent  # noqa
@@ -1,5 +1,8 @@
+from collections.abc import Iterable
+
 import httpx
-from django.db import models
+from django.db import connections, models, router
+from django.utils import timezone
 
 from activities.models.timeline_event import TimelineEvent
 from core.ld import canonicalise
@@ -320,6 +323,56 @@ class FanOut(StatorModel):
         null=True,
         related_name="subject_fan_outs",
     )
+    subject_playlist = models.ForeignKey(
+        "music.Playlist",
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name="fan_outs",
+    )
+    subject_playlist_interaction = models.ForeignKey(
+        "music.PlaylistInteraction",
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name="fan_outs",
+    )
 
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
+
+    ### Bulk creation ###
+
+    @classmethod
+    def bulk_insert_raw(cls, rows: Iterable[dict]):
+        """
+        Inserts new FanOuts from dicts of {attname: value} (all with the
+        same keys) without building model instances, streaming them in with
+        COPY. Meant for very large fan outs.
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return
+        connection = connections[router.db_for_write(cls)]
+        now = timezone.now()
+        extra = {
+            "state": FanOutStates.initial_state.name,
+            "state_changed": now,
+            "created": now,
+            "updated": now,
+        }
+        keys = list(first) + list(extra)
+        columns = ", ".join(
+            connection.ops.quote_name(cls._meta.get_field(key).column)
+            for key in keys
+        )
+        extra_values = tuple(extra.values())
+        with connection.cursor() as cursor:
+            with cursor.copy(
+                f"COPY {connection.ops.quote_name(cls._meta.db_table)} "
+                f"({columns}) FROM STDIN"
+            ) as copy:
+                copy.write_row((*first.values(), *extra_values))
+                for row in rows:
+                    copy.write_row((*row.values(), *extra_values))
@@ -1210,7 +1210,15 @@ class Post(StatorModel):
                 reply_parent.author_id if reply_parent else None
             ),
             "reblog": None,
-            "poll": self.type_data.to_mastodon_json(self, identity)
+            "poll": self.type_data.to_mastodon_json(
+                self,
+                identity,
+                votes=(
+                    interactions.get("vote", {}).get(self.pk, [])
+                    if interactions is not None
+                    else None
+                ),
+            )
             if isinstance(self.type_data, QuestionData)
             else None,
             "card": None,
@@ -1,4 +1,5 @@
 from collections.abc import Iterable
+from typing import TypedDict
 
 from django.db import models, transaction
 from django.utils import timezone
@@ -12,6 +13,19 @@ from stator.models import State, StateField, StateGraph, StatorModel
 from users.models.identity import Identity
 
 
+class PostInteractionsDict(TypedDict, total=False):
+    """
+    An identity's own interactions with a set of posts, as returned by
+    PostInteraction.get_post_interactions
+    """
+
+    like: set[int]
+    boost: set[int]
+    pin: set[int]
+    # Votes carry their chosen option names, so polls need no extra query
+    vote: dict[int, list[str]]
+
+
 class PostInteractionStates(StateGraph):
     new = State(try_interval=300)
     fanned_out = State(externally_progressed=True)
@@ -170,29 +184,39 @@ class PostInteraction(StatorModel):
     ### Display helpers ###
 
     @classmethod
-    def get_post_interactions(cls, posts, identity):
+    def get_post_interactions(cls, posts, identity) -> PostInteractionsDict:
         """
         Returns a dict of {interaction_type: set(post_ids)} for all the posts
         and the given identity, for use in templates.
+
+        Votes are instead keyed as {"vote": {post_id: [values]}} so polls can
+        be rendered without a query per post.
         """
-        # Bulk-fetch any of our own interactions
+        # Bulk-fetch any of our own active interactions
         ids_with_interaction_type = cls.objects.filter(
             identity=identity,
             post_id__in=[post.pk for post in posts],
-            type__in=[cls.Types.like, cls.Types.boost, cls.Types.pin],
+            type__in=[cls.Types.like, cls.Types.boost, cls.Types.pin, cls.Types.vote],
             state__in=[PostInteractionStates.new, PostInteractionStates.fanned_out],
-        ).values_list("post_id", "type")
+        ).values_list("post_id", "type", "value")
         # Make it into the return dict
-        result = {}
-        for post_id, interaction_type in ids_with_interaction_type:
-            result.setdefault(interaction_type, set()).add(post_id)
+        result: PostInteractionsDict = {}
+        for post_id, interaction_type, value in ids_with_interaction_type:
+            if interaction_type == cls.Types.like:
+                result.setdefault("like", set()).add(post_id)
+            elif interaction_type == cls.Types.boost:
+                result.setdefault("boost", set()).add(post_id)
+            elif interaction_type == cls.Types.pin:
+                result.setdefault("pin", set()).add(post_id)
+            else:
+                result.setdefault("vote", {}).setdefault(post_id, []).append(value)
         return result
 
     @classmethod
-    def get_event_interactions(cls, events, identity) -> dict[str, set[str]]:
+    def get_event_interactions(cls, events, identity) -> PostInteractionsDict:
         """
-        Returns a dict of {interaction_type: set(post_ids)} for all the posts
-        within the events and the given identity, for use in templates.
+        Returns the get_post_interactions dict for all the posts within the
+        events and the given identity, for use in templates.
         """
         return cls.get_post_interactions(
             [e.subject_post for e in events if e.subject_post], identity
@@ -1,10 +1,11 @@
 import json
 from datetime import datetime
-from typing import Literal
+from typing import Annotated, Literal, Union
 
+import orjson
 from django.utils import timezone
 from django.utils.module_loading import import_string
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, root_validator
 from django.conf import settings
 
 from core.ld import format_ld_date
@@ -19,10 +20,12 @@ class QuestionOption(BaseModel):
     type: Literal["Note"] = "Note"
     votes: int = 0
 
-    def __init__(self, **data) -> None:
-        data["votes"] = data.get("votes", data.get("replies", {}).get("totalItems", 0))
-
-        super().__init__(**data)
+    @root_validator(pre=True)
+    def populate_votes(cls, values):
+        values["votes"] = values.get(
+            "votes", values.get("replies", {}).get("totalItems", 0)
+        )
+        return values
 
 
 class QuestionData(BasePostDataType):
@@ -36,21 +39,29 @@ class QuestionData(BasePostDataType):
         extra = "ignore"
         allow_population_by_field_name = True
 
-    def __init__(self, **data) -> None:
-        data["voter_count"] = data.get(
-            "voter_count", data.get("votersCount", data.get("toot:votersCount", 0))
+    @root_validator(pre=True)
+    def populate_voters_and_options(cls, values):
+        values["voter_count"] = values.get(
+            "voter_count", values.get("votersCount", values.get("toot:votersCount", 0))
         )
 
-        if "mode" not in data:
-            data["mode"] = "anyOf" if "anyOf" in data else "oneOf"
-        if "options" not in data:
-            options = data.pop("anyOf", None)
+        if "mode" not in values:
+            values["mode"] = "anyOf" if "anyOf" in values else "oneOf"
+        if "options" not in values:
+            options = values.pop("anyOf", None)
             if not options:
-                options = data.pop("oneOf", None)
-            data["options"] = options
-        super().__init__(**data)
-
-    def to_mastodon_json(self, post, identity=None):
+                options = values.pop("oneOf", None)
+            values["options"] = options
+        return values
+
+    def to_mastodon_json(self, post, identity=None, votes=None):
+        """
+        Returns the Mastodon poll JSON for this question.
+
+        votes is an optional list of the identity's vote values on this post,
+        as prefetched by PostInteraction.get_post_interactions; if it is not
+        provided they are fetched here.
+        """
         from activities.models import PostInteraction
 
         multiple = self.mode == "anyOf"
@@ -84,13 +95,16 @@ class QuestionData(BasePostDataType):
             option_map[option.name] = index
 
         if identity:
-            votes = post.interactions.filter(
-                identity=identity,
-                type=PostInteraction.Types.vote,
-            )
-            value["voted"] = post.author == identity or votes.exists()
+            if votes is None:
+                votes = list(
+                    post.interactions.filter(
+                        identity=identity,
+                        type=PostInteraction.Types.vote,
+                    ).values_list("value", flat=True)
+                )
+            value["voted"] = post.author_id == identity.id or bool(votes)
             value["own_votes"] = [
-                option_map[vote.value] for vote in votes if vote.value in option_map
+                option_map[vote] for vote in votes if vote in option_map
             ]
 
         return value
@@ -104,30 +118,84 @@ class ArticleData(BasePostDataType):
         extra = "ignore"
 
 
-PostDataType = QuestionData | ArticleData
+# Extra post types are resolved once at import time, and the whole union is
+# tagged on "type" so pydantic dispatches straight to the matching model
+# rather than trying each variant in turn.
+extra_post_types = [
+    import_string(post_data_type_str)
+    for post_data_type_str in settings.TAKAHE_EXTRA_POST_TYPES.values()
+    if post_data_type_str
+]
 
-
-for post_data_type in settings.TAKAHE_EXTRA_POST_TYPES:
-    if post_data_type_str := settings.TAKAHE_EXTRA_POST_TYPES.get(post_data_type):
-        PostDataType |= import_string(post_data_type_str)
+PostDataType = Annotated[
+    Union[tuple([QuestionData, ArticleData, *extra_post_types])],
+    Field(discriminator="type"),
+]
 
 
 class PostTypeData(BaseModel):
-    __root__: PostDataType = Field(discriminator="type")
+    __root__: PostDataType
+
+
+# Pydantic v1 builds the root field validator once at class creation, so
+# binding parse_obj here is all the caching the decode hot path needs.
+_parse_post_type_data = PostTypeData.parse_obj
+
+
+def _default(obj):
+    """
+    Fallback serializer for types JSON does not natively handle
+    """
+    if isinstance(obj, BasePostDataType):
+        return obj.dict()
+    elif isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _to_post_type_data(value):
+    if isinstance(value, dict):
+        return _parse_post_type_data(value).__root__
+    return value
+
+
+def dumps(obj, sort_keys: bool = False) -> str:
+    """
+    Serializes post type data to a JSON string
+    """
+    option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(obj, default=_default, option=option).decode()
+
+
+def loads(s: str | bytes):
+    """
+    Parses a JSON string, turning objects back into post type data
+    """
+    return _to_post_type_data(orjson.loads(s))
 
 
 class PostTypeDataEncoder(json.JSONEncoder):
+    def encode(self, obj):
+        # orjson can't do custom indentation or key skipping, so leave
+        # those to the standard library
+        if self.indent is not None or self.skipkeys:
+            return super().encode(obj)
+        return dumps(obj, sort_keys=self.sort_keys)
+
     def default(self, obj):
-        if isinstance(obj, BasePostDataType):
-            return obj.dict()
-        elif isinstance(obj, datetime):
-            return obj.isoformat()
-        return json.JSONEncoder.default(self, obj)
+        return _default(obj)
 
 
 class PostTypeDataDecoder(json.JSONDecoder):
-    def decode(self, *args, **kwargs):
-        s = super().decode(*args, **kwargs)
-        if isinstance(s, dict):
-            return PostTypeData.parse_obj(s).__root__
-        return s
+    def decode(self, s, *args, **kwargs):
+        # Custom hooks need the standard library's parser to call them
+        if (
+            self.object_hook
+            or self.object_pairs_hook
+            or self.parse_float is not float
+            or self.parse_int is not int
+        ):
+            return _to_post_type_data(super().decode(s, *args, **kwargs))
+        return loads(s)
@@ -55,6 +55,15 @@ class TimelineEvent(models.Model):
         null=True,
         related_name="timeline_events_about_us",
     )
+    # Indexed in Meta so the index can be built concurrently
+    subject_playlist = models.ForeignKey(
+        "music.Playlist",
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name="timeline_events",
+        db_index=False,
+    )
 
     published = models.DateTimeField(default=timezone.now)
     seen = models.BooleanField(default=False)
@@ -70,6 +79,9 @@ class TimelineEvent(models.Model):
             ),
             models.Index(fields=["identity", "type", "subject_identity"]),
             models.Index(fields=["identity", "created"]),
+            models.Index(
+                fields=["subject_playlist"], name="ix_timeline_subject_playlist"
+            ),
         ]
 
     ### Alternate constructors ###
@@ -115,6 +127,19 @@ class TimelineEvent(models.Model):
             defaults={"published": post.published or post.created},
         )[0]
 
+    @classmethod
+    def add_playlist_item(cls, identity, playlist_item):
+        """
+        Adds a playlist with newly added items to the timeline if it's not
+        there already
+        """
+        return cls.objects.get_or_create(
+            identity=identity,
+            type=cls.Types.playlist_item,
+            subject_playlist_id=playlist_item.playlist_id,
+            defaults={"published": playlist_item.created},
+        )[0]
+
     @classmethod
     def add_mentioned(cls, identity, post):
         """
@@ -190,6 +215,25 @@ class TimelineEvent(models.Model):
                 subject_identity_id=interaction.identity_id,
             ).delete()
 
+    @classmethod
+    def delete_playlist_interaction(cls, interaction):
+        """
+        Removes every identity's timeline events about a playlist interaction.
+        Nothing references timeline events, so Django fast-deletes this as a
+        single DELETE rather than collecting the rows first.
+        """
+        if interaction.type == interaction.Types.like:
+            types = [cls.Types.liked]
+        elif interaction.type == interaction.Types.boost:
+            types = [cls.Types.boosted, cls.Types.boost]
+        else:
+            return
+        cls.objects.filter(
+            type__in=types,
+            subject_playlist_id=interaction.playlist_id,
+            subject_identity_id=interaction.identity_id,
+        ).delete()
+
     @classmethod
     def delete_follow(cls, target, source):
         TimelineEvent.objects.filter(
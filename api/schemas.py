@@ -183,7 +183,7 @@ class Status(Schema):
     def from_post(
         cls,
         post: activities_models.Post,
-        interactions: dict[str, set[str]] | None = None,
+        interactions: activities_models.PostInteractionsDict | None = None,
         bookmarks: set[str] | None = None,
         identity: users_models.Identity | None = None,
     ) -> "Status":
@@ -219,7 +219,7 @@ class Status(Schema):
     def from_timeline_event(
         cls,
         timeline_event: activities_models.TimelineEvent,
-        interactions: dict[str, set[str]] | None = None,
+        interactions: activities_models.PostInteractionsDict | None = None,
         bookmarks: set[str] | None = None,
         identity: users_models.Identity | None = None,
     ) -> "Status":
@@ -1,4 +1,6 @@
 import io
+from collections.abc import Iterator
+from contextlib import contextmanager
 
 import blurhash
 import httpx
@@ -12,8 +14,32 @@ class ImageFile(File):
     image: Image
 
 
+def _exif_transpose(img: Image.Image) -> Image.Image:
+    try:
+        # Take any orientation EXIF data, apply it, and strip the
+        # orientation data from the new image.
+        return ImageOps.exif_transpose(img)
+    except Exception:  # noqa
+        # exif_transpose can crash with different errors depending on
+        # the EXIF keys. Just ignore them all, better to have a rotated
+        # image than no image.
+        return img
+
+
+@contextmanager
+def open_image(image: File) -> Iterator[Image.Image]:
+    """
+    Decodes an image file (applying any EXIF orientation) so it can be
+    passed to resize_image several times without decoding it again.
+    The file is closed when the with block exits.
+    """
+    with Image.open(image) as img:
+        img.load()
+        yield _exif_transpose(img)
+
+
 def resize_image(
-    image: File,
+    image: File | Image.Image,
     *,
     size: tuple[int, int],
     cover=True,
@@ -21,33 +47,38 @@ def resize_image(
 ) -> ImageFile:
     """
     Resizes an image to fit insize the given size (cropping one dimension
-    to fit if needed)
+    to fit if needed). Takes either an image file or an already-opened
+    image from open_image.
     """
+    if isinstance(image, Image.Image):
+        return _resize_image(image, size=size, cover=cover, keep_format=keep_format)
     with Image.open(image) as img:
-        try:
-            # Take any orientation EXIF data, apply it, and strip the
-            # orientation data from the new image.
-            img = ImageOps.exif_transpose(img)
-        except Exception:  # noqa
-            # exif_transpose can crash with different errors depending on
-            # the EXIF keys. Just ignore them all, better to have a rotated
-            # image than no image.
-            pass
-
-        if cover:
-            resized_image = ImageOps.fit(img, size, method=Image.Resampling.BILINEAR)
-        else:
-            resized_image = img.copy()
-            resized_image.thumbnail(size, resample=Image.Resampling.BILINEAR)
-        new_image_bytes = io.BytesIO()
-        if keep_format:
-            resized_image.save(new_image_bytes, format=img.format)
-            file = ImageFile(new_image_bytes)
-        else:
-            resized_image.save(new_image_bytes, format="webp", save_all=True)
-            file = ImageFile(new_image_bytes, name="image.webp")
-        file.image = resized_image
-        return file
+        return _resize_image(
+            _exif_transpose(img), size=size, cover=cover, keep_format=keep_format
+        )
+
+
+def _resize_image(
+    img: Image.Image,
+    *,
+    size: tuple[int, int],
+    cover: bool,
+    keep_format: bool,
+) -> ImageFile:
+    if cover:
+        resized_image = ImageOps.fit(img, size, method=Image.Resampling.BILINEAR)
+    else:
+        resized_image = img.copy()
+        resized_image.thumbnail(size, resample=Image.Resampling.BILINEAR)
+    new_image_bytes = io.BytesIO()
+    if keep_format:
+        resized_image.save(new_image_bytes, format=img.format)
+        file = ImageFile(new_image_bytes)
+    else:
+        resized_image.save(new_image_bytes, format="webp", save_all=True)
+        file = ImageFile(new_image_bytes, name="image.webp")
+    file.image = resized_image
+    return file
 
 
 def blurhash_image(file) -> str:
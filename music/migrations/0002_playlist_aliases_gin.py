@@ -0,0 +1,21 @@
+# Generated by Django 4.2.8 on 2026-10-15 09:12
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("music", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="playlist",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["aliases"],
+                name="playlist_aliases_gin",
+                opclasses=["jsonb_path_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.8 on 2026-10-15 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("music", "0002_playlist_aliases_gin"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="playlistinteraction",
+            index=models.Index(
+                fields=["identity", "state", "type", "playlist"],
+                name="ix_playlistint_identity_feed",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.8 on 2026-10-15 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("music", "0003_playlistinteraction_identity_feed"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="playlistinteraction",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("type", "pin"), ("state__in", ["new", "fanned_out"])
+                ),
+                fields=("type", "identity", "playlist"),
+                name="uq_playlistint_active_pin",
+            ),
+        ),
+    ]
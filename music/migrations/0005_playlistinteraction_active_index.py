@@ -0,0 +1,20 @@
+# Generated by Django 4.2.8 on 2026-10-15 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("music", "0004_playlistinteraction_active_pin_unique"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="playlistinteraction",
+            index=models.Index(
+                condition=models.Q(("state__in", ["new", "fanned_out"])),
+                fields=["identity", "playlist", "type"],
+                name="ix_playlistint_active",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.8 on 2026-10-15 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("music", "0005_playlistinteraction_active_index"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="playlistinteraction",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("type", "vote")),
+                fields=("identity", "playlist", "value"),
+                name="uq_playlistint_vote",
+            ),
+        ),
+    ]
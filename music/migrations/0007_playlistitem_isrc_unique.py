@@ -0,0 +1,38 @@
+# Generated by Django 4.2.8 on 2026-10-15 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("music", "0006_playlistinteraction_vote_unique"),
+    ]
+
+    operations = [
+        # Keep only the latest row of each duplicate, as that's the one
+        # get_delta would have replayed last
+        migrations.RunSQL(
+            """
+            DELETE FROM music_playlistitem WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY playlist_id, isrc, type, identity_id, operation
+                        ORDER BY created DESC, id DESC
+                    ) AS row_number
+                    FROM music_playlistitem
+                    WHERE isrc IS NOT NULL
+                ) AS ranked
+                WHERE row_number > 1
+            );
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name="playlistitem",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("isrc__isnull", False)),
+                fields=("playlist", "isrc", "type", "identity", "operation"),
+                name="uq_playlistite_isrc",
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.8 on 2026-10-15 14:50
+
+from django.db import migrations
+
+import music.models.playlist
+import stator.models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("music", "0007_playlistitem_isrc_unique"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="playlist",
+            name="state",
+            field=stator.models.StateField(
+                choices=[
+                    ("outdated", "outdated"),
+                    ("updated", "updated"),
+                    ("deleted", "deleted"),
+                    ("deleted_fanned_out", "deleted_fanned_out"),
+                ],
+                default="outdated",
+                graph=music.models.playlist.PlaylistStates,
+                max_length=100,
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.8 on 2026-10-15 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("music", "0008_alter_playlist_state"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="playlistitem",
+            index=models.Index(
+                fields=["identity", "created"],
+                name="ix_playlistite_identity_crtd",
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.8 on 2026-10-15 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("music", "0009_playlistitem_identity_created"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="playlistitem",
+            name="type",
+            field=models.CharField(
+                choices=[
+                    ("like", "Like"),
+                    ("boost", "Boost"),
+                    ("vote", "Vote"),
+                    ("pin", "Pin"),
+                    ("track", "Track"),
+                ],
+                max_length=100,
+            ),
+        ),
+    ]
@@ -1,20 +1,23 @@
+import heapq
 import re
 from datetime import date, timedelta
+from functools import cached_property
+from operator import itemgetter
 from typing import Optional
-from django.http import JsonResponse
-from django.shortcuts import redirect
 
 import urlman
-from django.db import models
-from django.utils import timezone
+from django.contrib.postgres.indexes import GinIndex
+from django.core.cache import cache
 from django.db import models, transaction
+from django.utils import timezone
+
 from activities.models.emoji import Emoji
 from activities.models.hashtag import Hashtag
 from activities.models.post_types import PostTypeData
 from core.html import FediverseHtmlParser
-from core.ld import canonicalise, format_ld_date
-
+from core.ld import format_ld_date
 from core.models import Config
+from music.models.track import Track
 from stator.models import State, StateField, StateGraph, StatorModel
 from users.models.identity import Identity
 
@@ -22,9 +25,14 @@ from users.models.identity import Identity
 class PlaylistStates(StateGraph):
     outdated = State(try_interval=300, force_initial=True)
     updated = State(externally_progressed=True)
+    deleted = State(try_interval=300)
+    deleted_fanned_out = State()
 
     outdated.transitions_to(updated)
     updated.transitions_to(outdated)
+    outdated.transitions_to(deleted)
+    updated.transitions_to(deleted)
+    deleted.transitions_to(deleted_fanned_out)
 
     @classmethod
     def handle_outdated(cls, instance: "Playlist"):
@@ -33,37 +41,63 @@ class PlaylistStates(StateGraph):
         """
         from activities.models.post import Post
 
-        posts_query = Post.objects.local_public().playlistged_with(instance)
-        total = posts_query.count()
-
-        today = timezone.now().date()
-        total_today = posts_query.filter(
-            created__gte=today,
-            created__lte=today + timedelta(days=1),
-        ).count()
-        total_month = posts_query.filter(
-            created__year=today.year,
-            created__month=today.month,
-        ).count()
-        total_year = posts_query.filter(
-            created__year=today.year,
-        ).count()
+        now = timezone.now()
+        today = now.date()
+        today_q = models.Q(created__gte=today, created__lte=today + timedelta(days=1))
+        month_q = models.Q(created__year=today.year, created__month=today.month)
+        year_q = models.Q(created__year=today.year)
+        # Count every window in a single pass over the matching posts
+        counts = (
+            Post.objects.local_public()
+            .playlistged_with(instance)
+            .aggregate(
+                total=models.Count("id"),
+                total_today=models.Count("id", filter=today_q),
+                total_month=models.Count("id", filter=month_q),
+                total_year=models.Count("id", filter=year_q),
+            )
+        )
+        total = counts["total"]
+        total_today = counts["total_today"]
+        total_month = counts["total_month"]
+        total_year = counts["total_year"]
         if total:
-            if not instance.stats:
-                instance.stats = {}
-            instance.stats.update(
-                {
-                    "total": total,
-                    today.isoformat(): total_today,
-                    today.strftime("%Y-%m"): total_month,
-                    today.strftime("%Y"): total_year,
-                }
+            instance.stats = {
+                **(instance.stats or {}),
+                "total": total,
+                today.isoformat(): total_today,
+                f"{today.year:04d}-{today.month:02d}": total_month,
+                f"{today.year:04d}": total_year,
+            }
+            instance.stats_updated = now
+            # Only write the stats columns rather than the whole row
+            Playlist.objects.filter(pk=instance.pk).update(
+                stats=instance.stats,
+                stats_updated=instance.stats_updated,
             )
-            instance.stats_updated = timezone.now()
-            instance.save()
 
         return cls.updated
 
+    @classmethod
+    def handle_deleted(cls, instance: "Playlist"):
+        """
+        Removes the timeline events for a deleted Playlist, in batches so a
+        popular playlist doesn't hold one enormous delete open.
+        """
+        from activities.models.timeline_event import TimelineEvent
+
+        events = TimelineEvent.objects.filter(subject_playlist_id=instance.pk)
+        while True:
+            event_ids = list(
+                events.values_list("pk", flat=True)[
+                    : Playlist.TIMELINE_EVENT_DELETE_BATCH_SIZE
+                ]
+            )
+            if not event_ids:
+                break
+            TimelineEvent.objects.filter(pk__in=event_ids).delete()
+        return cls.deleted_fanned_out
+
 
 class PlaylistQuerySet(models.QuerySet):
     def public(self):
@@ -74,7 +108,7 @@ class PlaylistQuerySet(models.QuerySet):
 
     def playlist_or_alias(self, playlist: str):
         return self.filter(
-            models.Q(playlist=playlist) | models.Q(aliases__contains=playlist)
+            models.Q(playlist=playlist) | models.Q(aliases__contains=[playlist])
         )
 
 
@@ -92,6 +126,9 @@ class PlaylistManager(models.Manager):
 class Playlist(StatorModel):
     MAXIMUM_LENGTH = 100
 
+    # How many timeline events to remove per query once deleted
+    TIMELINE_EVENT_DELETE_BATCH_SIZE = 10000
+
     class Visibilities(models.IntegerChoices):
         public = 0
         local_only = 4
@@ -128,6 +165,15 @@ class Playlist(StatorModel):
 
     objects = PlaylistManager()
 
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=["aliases"],
+                name="playlist_aliases_gin",
+                opclasses=["jsonb_path_ops"],
+            ),
+        ]
+
     class urls(urlman.Urls):
         view = "/playlists/{self.playlist}/"
         follow = "/playlists/{self.playlist}/follow/"
@@ -138,7 +184,7 @@ class Playlist(StatorModel):
         admin_disable = "{admin_edit}disable/"
         timeline = "/playlists/{self.playlist}/"
 
-    playlist_regex = re.compile(r"\B#([a-zA-Z0-9(_)]+\b)(?!;)")
+    playlist_regex = re.compile(r"\B#([A-Za-z0-9_]+)\b(?!;)")
 
     @classmethod
     def create_local(
@@ -200,11 +246,40 @@ class Playlist(StatorModel):
         return post
 
     def save(self, *args, **kwargs):
-        self.playlist = self.playlist.lstrip("#")
-        if self.name_override:
+        # Values are almost always normalized already, so only strip when needed
+        if self.playlist and self.playlist[0] == "#":
+            self.playlist = self.playlist.lstrip("#")
+        if self.name_override and self.name_override[0] == "#":
             self.name_override = self.name_override.lstrip("#")
         return super().save(*args, **kwargs)
 
+    @classmethod
+    def bump_ap_version(cls, playlist_id):
+        """
+        Marks a playlist's cached AP JSON as stale. Changes to its items,
+        attachments and interactions don't touch updated, so call this
+        after those.
+        """
+        key = f"playlist_ap_version:{playlist_id}"
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+    @property
+    def ap_version(self) -> int:
+        return cache.get(f"playlist_ap_version:{self.pk}", 0)
+
+    def calculate_stats(self):
+        """
+        Queues a recount of this Playlist's stats; the outdated state handler
+        does the counting in the background, so this is a single UPDATE.
+        """
+        Playlist.transition_perform_queryset(
+            Playlist.objects.filter(pk=self.pk, state=PlaylistStates.updated),
+            PlaylistStates.outdated,
+        )
+
     @property
     def display_name(self):
         return self.name_override or self.playlist
@@ -218,56 +293,38 @@ class Playlist(StatorModel):
         """
         if not self.stats:
             return {}
-        results = {}
-        for key, val in self.stats.items():
-            parts = key.split("-")
-            if len(parts) == 2:
-                year = int(parts[0])
-                month = int(parts[1])
-                results[date(year, month, 1)] = val
-        return dict(sorted(results.items(), reverse=True)[:num])
+        months = (
+            (date(*map(int, key.split("-")), 1), val)
+            for key, val in self.stats.items()
+            if key.count("-") == 1
+        )
+        return dict(heapq.nlargest(num, months, key=itemgetter(0)))
     
     def to_ap(self) -> dict:
         """
         Returns the AP JSON for this object
         """
         self.author.ensure_uris()
-        value = {
-            "to": [],
-            "cc": [],
-            "type": self.type,
-            "id": self.object_uri,
-            "name": self.name,
-            "published": format_ld_date(self.published),
-            "attributedTo": self.author.actor_uri,
-            "content": self.safe_content_remote(),
-            "sensitive": self.sensitive,
-            "url": self.absolute_object_uri(),
-            "tag": [],
-            "attachment": [],
-        } 
-        if self.description:
-            value["description"] = self.description
-        if self.in_reply_to:
-            value["inReplyTo"] = self.in_reply_to
-        if self.edited:
-            value["updated"] = format_ld_date(self.edited)
+        to = []
+        cc = []
+        tag = []
+        attachment = []
         # Targeting
         if self.visibility == self.Visibilities.public:
-            value["to"].append("as:Public")
+            to.append("as:Public")
         elif self.visibility == self.Visibilities.unlisted:
-            value["cc"].append("as:Public")
+            cc.append("as:Public")
         elif (
             self.visibility == self.Visibilities.followers and self.author.followers_uri
         ):
-            value["to"].append(self.author.followers_uri)
+            to.append(self.author.followers_uri)
         # Mentions
         for mention in self.mentions.all():
-            value["tag"].append(mention.to_ap_tag())
-            value["cc"].append(mention.actor_uri)
+            tag.append(mention.to_ap_tag())
+            cc.append(mention.actor_uri)
         # Hashtags
         for hashtag in self.hashtags or []:
-            value["tag"].append(
+            tag.append(
                 {
                     "href": f"https://{self.author.domain.uri_domain}/tags/{hashtag}/",
                     "name": f"#{hashtag}",
@@ -276,14 +333,35 @@ class Playlist(StatorModel):
             )
         # Emoji
         for emoji in self.emojis.all():
-            value["tag"].append(emoji.to_ap_tag())
+            tag.append(emoji.to_ap_tag())
         # Attachments
-        for attachment in self.attachments.all():
-            value["attachment"].append(attachment.to_ap())
-        # Remove fields if they're empty
-        for field in ["to", "cc", "tag", "attachment"]:
-            if not value[field]:
-                del value[field]
+        for playlist_attachment in self.playlist_attachments.all():
+            attachment.append(playlist_attachment.to_ap())
+        value = {
+            "type": self.type,
+            "id": self.object_uri,
+            "name": self.name,
+            "published": format_ld_date(self.published),
+            "attributedTo": self.author.actor_uri,
+            "content": self.safe_content_remote(),
+            "sensitive": self.sensitive,
+            "url": self.absolute_object_uri(),
+        }
+        # Only include fields that have content
+        if to:
+            value["to"] = to
+        if cc:
+            value["cc"] = cc
+        if tag:
+            value["tag"] = tag
+        if attachment:
+            value["attachment"] = attachment
+        if self.description:
+            value["description"] = self.description
+        if self.in_reply_to:
+            value["inReplyTo"] = self.in_reply_to
+        if self.edited:
+            value["updated"] = format_ld_date(self.edited)
         return value
 
     def to_create_ap(self):
@@ -337,7 +415,7 @@ class Playlist(StatorModel):
                 for
                 item
                 in
-                self.delta.all()
+                self.delta
             ]
         }
 
@@ -346,13 +424,13 @@ class Playlist(StatorModel):
             "@context": "https://schema.org",
             "type": "MusicPlaylist",
             "name": self.name,
-            "numTracks": self.delta.count(),
+            "numTracks": len(self.delta),
             "track": [
                 track.to_json_ld()
                 for
                 track
                 in
-                self.delta.all()
+                self.delta
             ]
         }
 
@@ -362,50 +440,77 @@ class Playlist(StatorModel):
         """
         if not self.stats:
             return {}
-        results = {}
-        for key, val in self.stats.items():
-            parts = key.split("-")
-            if len(parts) == 3:
-                year = int(parts[0])
-                month = int(parts[1])
-                day = int(parts[2])
-                results[date(year, month, day)] = val
-        return dict(sorted(results.items(), reverse=True)[:num])
+        days = (
+            (date(*map(int, key.split("-"))), val)
+            for key, val in self.stats.items()
+            if key.count("-") == 2
+        )
+        return dict(heapq.nlargest(num, days, key=itemgetter(0)))
     
-    @property
+    @cached_property
     def delta(self):
+        """
+        The current tracklist, memoized per instance; pop it from __dict__
+        when items change.
+        """
         return self.get_delta()
  
     def get_delta(self, datum=None):
         """
         Gets delta of tracklist (additions minus deletions)
         """
-        items = []
+        from music.models.playlist_item import PlaylistItem
+
         if not datum:
             datum = timezone.now()
-        for playlist_item in self.items.filter(
-            created__lte=datum
-        ):
-            if playlist_item.operation == 'add':
-                items.append(playlist_item)
-            
-            if playlist_item.operation == 'delete':
-                items = [
-                    item
-                    for 
-                    item
-                    in
-                    items
-                    if
-                    item.isrc != playlist_item.isrc or (
-                        item.name != playlist_item.name and
-                        item.artist_name != playlist_item.artist_name and
-                        item.release_name != playlist_item.release_name and
-                        item.upc != playlist_item.upc and
-                        item.isni != playlist_item.isni
-                    )
-                ]
-        return items           
+        # Replay the operations on bare rows, and only load the surviving items
+        pks = self.replay_operations(
+            (PlaylistItem.make_track_key(*track_fields), operation, pk)
+            for pk, operation, *track_fields in (
+                self.music_items.filter(created__lte=datum)
+                .order_by("created")
+                .values_list("pk", "operation", *PlaylistItem.TRACK_KEY_FIELDS)
+                .iterator(chunk_size=2000)
+            )
+        )
+        items = Track.with_json_prefetch(
+            self.music_items.select_related("track"), prefix="track__"
+        ).in_bulk(pks)
+        return [items[pk] for pk in pks]
+
+    @staticmethod
+    def replay_operations(operations) -> list:
+        """
+        Replays (track_key, operation, value) triples in order, keyed by track
+        identity so adds and deletes are both O(1), and returns the values of
+        the tracks left at the end.
+        """
+        current = {}
+        for key, operation, value in operations:
+            if operation == "add":
+                current[key] = value
+            elif operation == "delete":
+                current.pop(key, None)
+        return list(current.values())
+
+    @cached_property
+    def tracklist(self) -> list:
+        """
+        The current items for display, replayed from the active operations.
+        Uses the ones PlaylistService.queryset() prefetches when present.
+        """
+        from music.models.playlist_item import PlaylistItemStates
+
+        operations = getattr(self, "item_operations", None)
+        if operations is None:
+            operations = (
+                self.music_items.filter(state__in=PlaylistItemStates.group_active())
+                .select_related("identity")
+                .order_by("created")
+            )
+        return self.replay_operations(
+            (item.track_key, item.operation, item) for item in operations
+        )
 
     def to_mastodon_json(self, following: bool | None = None):
         value = {
@@ -2,6 +2,7 @@ from functools import partial
 
 from django.db import models
 
+from .playlist import Playlist
 from core.uploads import upload_namer
 from core.uris import ProxyAbsoluteUrl, RelativeAbsoluteUrl
 from stator.models import State, StateField, StateGraph, StatorModel
@@ -64,6 +65,11 @@ class PlaylistAttachment(StatorModel):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if self.playlist_id:
+            Playlist.bump_ap_version(self.playlist_id)
+
     def is_image(self):
         return self.mimetype in [
             "image/apng",
@@ -1,9 +1,10 @@
 from collections.abc import Iterable
 
-from django.db import models, transaction
+from django.db import IntegrityError, models, transaction
 from django.utils import timezone
 
 from activities.models.fan_out import FanOut
+from activities.models.timeline_event import TimelineEvent
 from .playlist import Playlist
 from .playlist_types import QuestionData
 from core.ld import format_ld_date, get_str_or_id, parse_ld_date
@@ -31,48 +32,69 @@ class PlaylistInteractionStates(StateGraph):
         """
         Creates all needed fan-out objects for a new PlaylistInteraction.
         """
+        # Every branch reads the playlist and identity, so join them in up front
+        instance = PlaylistInteraction.objects.select_related(
+            "playlist", "identity"
+        ).get(pk=instance.pk)
+        interaction_type = instance.type
+        is_boost = interaction_type == PlaylistInteraction.Types.boost
+        fan_out_type = FanOut.Types.interaction
+        fan_outs = []
         # Boost: send a copy to all people who follow this user (limiting
         # to just local follows if it's a remote boost)
         # Pin: send Add activity to all people who follow this user
-        if instance.type == instance.Types.boost or instance.type == instance.Types.pin:
-            for target in instance.get_targets():
-                FanOut.objects.create(
-                    type=FanOut.Types.interaction,
-                    identity=target,
-                    subject_playlist=instance.playlist,
-                    subject_playlist_interaction=instance,
-                )
+        if is_boost or interaction_type == PlaylistInteraction.Types.pin:
+            # This can be every follower of a large account, so it's
+            # streamed in with COPY rather than built as model instances
+            FanOut.bulk_insert_raw(
+                {
+                    "type": fan_out_type,
+                    "identity_id": target_id,
+                    "subject_playlist_id": instance.playlist_id,
+                    "subject_playlist_interaction_id": instance.pk,
+                }
+                for target_id in instance.get_targets()
+            )
         # Like: send a copy to the original playlist author only,
         # if the liker is local or they are
-        elif instance.type == instance.Types.like:
+        elif interaction_type == PlaylistInteraction.Types.like:
             if instance.identity.local or instance.playlist.local:
-                FanOut.objects.create(
-                    type=FanOut.Types.interaction,
-                    identity_id=instance.playlist.author_id,
-                    subject_playlist=instance.playlist,
-                    subject_playlist_interaction=instance,
+                fan_outs.append(
+                    FanOut(
+                        type=fan_out_type,
+                        identity_id=instance.playlist.author_id,
+                        subject_playlist=instance.playlist,
+                        subject_playlist_interaction=instance,
+                    )
                 )
         # Vote: send a copy of the vote to the original
         # playlist author only if it's a local interaction
         # to a non local playlist
-        elif instance.type == instance.Types.vote:
+        elif interaction_type == PlaylistInteraction.Types.vote:
             if instance.identity.local and not instance.playlist.local:
-                FanOut.objects.create(
-                    type=FanOut.Types.interaction,
-                    identity_id=instance.playlist.author_id,
-                    subject_playlist=instance.playlist,
-                    subject_playlist_interaction=instance,
+                fan_outs.append(
+                    FanOut(
+                        type=fan_out_type,
+                        identity_id=instance.playlist.author_id,
+                        subject_playlist=instance.playlist,
+                        subject_playlist_interaction=instance,
+                    )
                 )
         else:
             raise ValueError("Cannot fan out unknown type")
         # And one for themselves if they're local and it's a boost
-        if instance.type == PlaylistInteraction.Types.boost and instance.identity.local:
-            FanOut.objects.create(
-                identity_id=instance.identity_id,
-                type=FanOut.Types.interaction,
-                subject_playlist=instance.playlist,
-                subject_playlist_interaction=instance,
+        if is_boost and instance.identity.local:
+            fan_outs.append(
+                FanOut(
+                    identity_id=instance.identity_id,
+                    type=fan_out_type,
+                    subject_playlist=instance.playlist,
+                    subject_playlist_interaction=instance,
+                )
             )
+        FanOut.objects.bulk_create(
+            fan_outs, batch_size=PlaylistInteraction.FAN_OUT_BATCH_SIZE
+        )
         return cls.fanned_out
 
     @classmethod
@@ -80,37 +102,54 @@ class PlaylistInteractionStates(StateGraph):
         """
         Creates all needed fan-out objects to undo a PlaylistInteraction.
         """
+        # Every branch reads the playlist and identity, so join them in up front
+        instance = PlaylistInteraction.objects.select_related(
+            "playlist", "identity"
+        ).get(pk=instance.pk)
+        interaction_type = instance.type
+        is_boost = interaction_type == PlaylistInteraction.Types.boost
+        fan_out_type = FanOut.Types.undo_interaction
+        fan_outs = []
         # Undo Boost: send a copy to all people who follow this user
         # Undo Pin: send a Remove activity to all people who follow this user
-        if instance.type == instance.Types.boost or instance.type == instance.Types.pin:
+        if is_boost or interaction_type == PlaylistInteraction.Types.pin:
             for follow in instance.identity.inbound_follows.select_related(
                 "source", "target"
             ):
                 if follow.source.local or follow.target.local:
-                    FanOut.objects.create(
-                        type=FanOut.Types.undo_interaction,
-                        identity_id=follow.source_id,
-                        subject_playlist=instance.playlist,
-                        subject_playlist_interaction=instance,
+                    fan_outs.append(
+                        FanOut(
+                            type=fan_out_type,
+                            identity_id=follow.source_id,
+                            subject_playlist=instance.playlist,
+                            subject_playlist_interaction=instance,
+                        )
                     )
         # Undo Like: send a copy to the original playlist author only
-        elif instance.type == instance.Types.like:
-            FanOut.objects.create(
-                type=FanOut.Types.undo_interaction,
-                identity_id=instance.playlist.author_id,
-                subject_playlist=instance.playlist,
-                subject_playlist_interaction=instance,
+        elif interaction_type == PlaylistInteraction.Types.like:
+            fan_outs.append(
+                FanOut(
+                    type=fan_out_type,
+                    identity_id=instance.playlist.author_id,
+                    subject_playlist=instance.playlist,
+                    subject_playlist_interaction=instance,
+                )
             )
         else:
             raise ValueError("Cannot fan out unknown type")
         # And one for themselves if they're local and it's a boost
-        if instance.type == PlaylistInteraction.Types.boost and instance.identity.local:
-            FanOut.objects.create(
-                identity_id=instance.identity_id,
-                type=FanOut.Types.undo_interaction,
-                subject_playlist=instance.playlist,
-                subject_playlist_interaction=instance,
+        if is_boost and instance.identity.local:
+            fan_outs.append(
+                FanOut(
+                    identity_id=instance.identity_id,
+                    type=fan_out_type,
+                    subject_playlist=instance.playlist,
+                    subject_playlist_interaction=instance,
+                )
             )
+        FanOut.objects.bulk_create(
+            fan_outs, batch_size=PlaylistInteraction.FAN_OUT_BATCH_SIZE
+        )
         return cls.undone_fanned_out
 
 
@@ -119,6 +158,12 @@ class PlaylistInteraction(StatorModel):
     Handles both boosts and likes
     """
 
+    # How many FanOut rows to insert per query
+    FAN_OUT_BATCH_SIZE = 1000
+
+    # How many playlist IDs to look up interactions for per query
+    INTERACTIONS_BATCH_SIZE = 1000
+
     class Types(models.TextChoices):
         like = "like"
         boost = "boost"
@@ -165,7 +210,34 @@ class PlaylistInteraction(StatorModel):
     updated = models.DateTimeField(auto_now=True)
 
     class Meta:
-        indexes = [models.Index(fields=["type", "identity", "playlist"])]
+        indexes = [
+            models.Index(fields=["type", "identity", "playlist"]),
+            models.Index(
+                fields=["identity", "state", "type", "playlist"],
+                name="ix_playlistint_identity_feed",
+            ),
+            # Active interactions only, for get_playlist_interactions
+            models.Index(
+                fields=["identity", "playlist", "type"],
+                condition=models.Q(state__in=["new", "fanned_out"]),
+                name="ix_playlistint_active",
+            ),
+        ]
+        constraints = [
+            # Only one active pin per identity and playlist; handle_add_ap
+            # relies on this to insert with ON CONFLICT DO NOTHING
+            models.UniqueConstraint(
+                fields=["type", "identity", "playlist"],
+                condition=models.Q(type="pin", state__in=["new", "fanned_out"]),
+                name="uq_playlistint_active_pin",
+            ),
+            # An identity can only pick each poll option once
+            models.UniqueConstraint(
+                fields=["identity", "playlist", "value"],
+                condition=models.Q(type="vote"),
+                name="uq_playlistint_vote",
+            ),
+        ]
 
     ### Display helpers ###
 
@@ -175,17 +247,35 @@ class PlaylistInteraction(StatorModel):
         Returns a dict of {interaction_type: set(playlist_ids)} for all the playlists
         and the given identity, for use in templates.
         """
-        # Bulk-fetch any of our own interactions
-        ids_with_interaction_type = cls.objects.filter(
-            identity=identity,
-            playlist_id__in=[playlist.pk for playlist in playlists],
-            type__in=[cls.Types.like, cls.Types.boost, cls.Types.pin],
-            state__in=[PlaylistInteractionStates.new, PlaylistInteractionStates.fanned_out],
-        ).values_list("playlist_id", "type")
-        # Make it into the return dict
+        return cls.get_playlist_interactions_by_ids(
+            [playlist.pk for playlist in playlists], identity
+        )
+
+    @classmethod
+    def get_playlist_interactions_by_ids(cls, playlist_ids, identity):
+        """
+        As get_playlist_interactions, but takes playlist IDs directly so
+        callers don't need to load the Playlist objects.
+        """
+        playlist_ids = list(playlist_ids)
         result = {}
-        for playlist_id, interaction_type in ids_with_interaction_type:
-            result.setdefault(interaction_type, set()).add(playlist_id)
+        # Bulk-fetch any of our own interactions, in batches so the IN
+        # clause stays a reasonable size for long timelines
+        for start in range(0, len(playlist_ids), cls.INTERACTIONS_BATCH_SIZE):
+            ids_with_interaction_type = cls.objects.filter(
+                identity=identity,
+                playlist_id__in=playlist_ids[
+                    start : start + cls.INTERACTIONS_BATCH_SIZE
+                ],
+                type__in=[cls.Types.like, cls.Types.boost, cls.Types.pin],
+                state__in=[
+                    PlaylistInteractionStates.new,
+                    PlaylistInteractionStates.fanned_out,
+                ],
+            ).values_list("playlist_id", "type")
+            # Make it into the return dict
+            for playlist_id, interaction_type in ids_with_interaction_type:
+                result.setdefault(interaction_type, set()).add(playlist_id)
         return result
 
     @classmethod
@@ -194,54 +284,77 @@ class PlaylistInteraction(StatorModel):
         Returns a dict of {interaction_type: set(playlist_ids)} for all the playlists
         within the events and the given identity, for use in templates.
         """
-        return cls.get_playlist_interactions(
-            [e.subject_playlist for e in events if e.subject_playlist], identity
+        return cls.get_playlist_interactions_by_ids(
+            {e.subject_playlist_id for e in events if e.subject_playlist_id},
+            identity,
         )
 
-    def get_targets(self) -> Iterable[Identity]:
+    def get_targets(self) -> Iterable[int]:
         """
-        Returns an iterable with Identities of followers that have unique
-        shared_inbox among each other to be used as target.
+        Returns an iterable with the IDs of Identities of followers that have
+        unique shared_inbox among each other to be used as target.
 
         When interaction is boost, only boost follows are considered,
         for pins all followers are considered.
         """
-        # Start including the playlist author
-        targets = {self.playlist.author}
-
-        query = self.identity.inbound_follows.active()
+        # Full blocks are excluded in the database as an anti-join
+        blocked_ids = (
+            self.identity.outbound_blocks.active()
+            .filter(mute=False)
+            .values("target_id")
+        )
+        query = self.identity.inbound_follows.active().exclude(
+            source_id__in=blocked_ids
+        )
         # Include all followers that are following the boosts
         if self.type == self.Types.boost:
             query = query.filter(boosts=True)
-        for follow in query.select_related("source"):
-            targets.add(follow.source)
-
-        # Fetch the full blocks and remove them as targets
-        for block in (
-            self.identity.outbound_blocks.active()
-            .filter(mute=False)
-            .select_related("target")
-        ):
-            try:
-                targets.remove(block.target)
-            except KeyError:
-                pass
 
-        deduped_targets = set()
+        # Local targets always gets the boosts
+        # despite its creator locality
+        deduped_targets = set(
+            query.filter(source__local=True).values_list("source_id", flat=True)
+        )
         shared_inboxes = set()
-        for target in targets:
-            if target.local:
-                # Local targets always gets the boosts
-                # despite its creator locality
-                deduped_targets.add(target)
-            elif self.identity.local:
-                # Dedupe the targets based on shared inboxes
-                # (we only keep one per shared inbox)
-                if not target.shared_inbox_uri:
-                    deduped_targets.add(target)
-                elif target.shared_inbox_uri not in shared_inboxes:
-                    shared_inboxes.add(target.shared_inbox_uri)
-                    deduped_targets.add(target)
+        if self.identity.local:
+            remote_query = query.filter(source__local=False)
+            no_shared_inbox = models.Q(
+                source__shared_inbox_uri__isnull=True
+            ) | models.Q(source__shared_inbox_uri="")
+            deduped_targets.update(
+                remote_query.filter(no_shared_inbox).values_list(
+                    "source_id", flat=True
+                )
+            )
+            # Dedupe the targets based on shared inboxes in the database
+            # with DISTINCT ON (we only keep one per shared inbox)
+            for target_id, shared_inbox_uri in (
+                remote_query.exclude(no_shared_inbox)
+                .order_by("source__shared_inbox_uri", "source_id")
+                .distinct("source__shared_inbox_uri")
+                .values_list("source_id", "source__shared_inbox_uri")
+            ):
+                shared_inboxes.add(shared_inbox_uri)
+                deduped_targets.add(target_id)
+
+        # Include the playlist author, by the same rules (not every playlist
+        # has one)
+        author_id = getattr(self.playlist, "author_id", None)
+        author = (
+            Identity.objects.filter(pk=author_id)
+            .exclude(pk__in=blocked_ids)
+            .values_list("id", "shared_inbox_uri", "local")
+            .first()
+            if author_id
+            else None
+        )
+        if author is not None:
+            author_id, shared_inbox_uri, local = author
+            if local or (
+                self.identity.local
+                and (not shared_inbox_uri or shared_inbox_uri not in shared_inboxes)
+            ):
+                deduped_targets.add(author_id)
 
         return deduped_targets
 
@@ -254,24 +367,39 @@ class PlaylistInteraction(StatorModel):
         if question.end_time and timezone.now() > question.end_time:
             raise ValueError("Validation failed: The poll has already ended")
 
-        if playlist.interactions.filter(identity=identity, type=cls.Types.vote).exists():
+        # anyOf polls take several votes per identity, so the unique
+        # constraint can't stand in for this check
+        if playlist.playlist_interactions.filter(
+            identity=identity, type=cls.Types.vote
+        ).exists():
             raise ValueError("Validation failed: You have already voted on this poll")
 
         votes = []
         with transaction.atomic():
             for choice in set(choices):
-                vote = cls.objects.create(
-                    identity=identity,
-                    playlist=playlist,
-                    type=PlaylistInteraction.Types.vote,
-                    value=question.options[choice].name,
+                # Allocate the ID up front so the object URI goes in with the
+                # insert rather than needing a second save
+                vote_id = Snowflake.generate_post_interaction()
+                votes.append(
+                    cls(
+                        id=vote_id,
+                        identity=identity,
+                        playlist=playlist,
+                        type=PlaylistInteraction.Types.vote,
+                        value=question.options[choice].name,
+                        object_uri=f"{identity.actor_uri}#votes/{vote_id}",
+                    )
                 )
-                vote.object_uri = f"{identity.actor_uri}#votes/{vote.id}"
-                vote.save()
-                votes.append(vote)
 
                 if not playlist.local:
                     question.options[choice].votes += 1
+            try:
+                cls.objects.bulk_create(votes, batch_size=500)
+            except IntegrityError:
+                # A concurrent request got its votes in first
+                raise ValueError(
+                    "Validation failed: You have already voted on this poll"
+                )
 
             if not playlist.local:
                 question.voter_count += 1
@@ -289,35 +417,10 @@ class PlaylistInteraction(StatorModel):
         # Create an object URI if we don't have one
         if self.object_uri is None:
             self.object_uri = self.identity.actor_uri + f"#{self.type}/{self.id}"
-        if self.type == self.Types.boost:
-            value = {
-                "type": "Announce",
-                "id": self.object_uri,
-                "published": format_ld_date(self.published),
-                "actor": self.identity.actor_uri,
-                "object": self.playlist.object_uri,
-                "to": "as:Public",
-            }
-        elif self.type == self.Types.like:
-            value = {
-                "type": "Like",
-                "id": self.object_uri,
-                "published": format_ld_date(self.published),
-                "actor": self.identity.actor_uri,
-                "object": self.playlist.object_uri,
-            }
-        elif self.type == self.Types.vote:
-            value = {
-                "type": "Note",
-                "id": self.object_uri,
-                "to": self.playlist.author.actor_uri,
-                "name": self.value,
-                "inReplyTo": self.playlist.object_uri,
-                "attributedTo": self.identity.actor_uri,
-            }
-        elif self.type == self.Types.pin:
+        builder = _AP_BUILDERS.get(self.type)
+        if builder is None:
             raise ValueError("Cannot turn into AP")
-        return value
+        return builder(self)
 
     def to_create_ap(self):
         """
@@ -379,7 +482,10 @@ class PlaylistInteraction(StatorModel):
         """
         # Do we have one with the right ID?
         try:
-            boost = cls.objects.get(object_uri=data["id"])
+            # Callers go on to read the identity and playlist, so join them
+            boost = cls.objects.select_related("identity", "playlist").get(
+                object_uri=data["id"]
+            )
         except cls.DoesNotExist:
             if create:
                 # Resolve the author
@@ -390,12 +496,10 @@ class PlaylistInteraction(StatorModel):
                 playlist = Playlist.by_object_uri(target, fetch=True)
                 value = None
                 # Get the right type
-                if data["type"].lower() == "like":
-                    type = cls.Types.like
-                elif data["type"].lower() == "announce":
-                    type = cls.Types.boost
-                elif (
-                    data["type"].lower() == "create"
+                ap_type = data["type"].lower()
+                type = _AP_TYPES.get(ap_type)
+                if type is None and (
+                    ap_type == "create"
                     and object["type"].lower() == "note"
                     and isinstance(playlist.type_data, QuestionData)
                 ):
@@ -419,7 +523,7 @@ class PlaylistInteraction(StatorModel):
                             f"The identity {identity.handle} already voted in question {playlist.id}"
                         )
 
-                else:
+                elif type is None:
                     raise ValueError(f"Cannot handle AP type {data['type']}")
                 # Make the actual interaction
                 boost = cls.objects.create(
@@ -469,12 +573,11 @@ class PlaylistInteraction(StatorModel):
             if data["actor"] != interaction.identity.actor_uri:
                 raise ValueError("Actor mismatch on interaction undo")
             # Delete all events that reference it
-            interaction.timeline_events.all().delete()
+            TimelineEvent.delete_playlist_interaction(interaction)
             # Force it into undone_fanned_out as it's not ours
             interaction.transition_perform(PlaylistInteractionStates.undone_fanned_out)
-            # Recalculate playlist stats
+            # Recalculate playlist stats (likes and boosts never touch type data)
             interaction.playlist.calculate_stats()
-            interaction.playlist.calculate_type_data()
 
     @classmethod
     def handle_add_ap(cls, data):
@@ -501,12 +604,24 @@ class PlaylistInteraction(StatorModel):
                 return
             playlist = Playlist.by_object_uri(object_uri, fetch=True)
 
-            return PlaylistInteraction.objects.get_or_create(
+            # Insert if missing in a single statement; an existing active pin
+            # makes this a no-op via the unique constraint
+            PlaylistInteraction.objects.bulk_create(
+                [
+                    PlaylistInteraction(
+                        type=cls.Types.pin,
+                        identity=identity,
+                        playlist=playlist,
+                    )
+                ],
+                ignore_conflicts=True,
+            )
+            return PlaylistInteraction.objects.get(
                 type=cls.Types.pin,
                 identity=identity,
                 playlist=playlist,
                 state__in=PlaylistInteractionStates.group_active(),
-            )[0]
+            )
 
     @classmethod
     def handle_remove_ap(cls, data):
@@ -586,3 +701,49 @@ class PlaylistInteraction(StatorModel):
             "edited_at": None,
             "reblog": playlist_json,
         }
+
+
+def _announce_ap(interaction: PlaylistInteraction) -> dict:
+    return {
+        "type": "Announce",
+        "id": interaction.object_uri,
+        "published": format_ld_date(interaction.published),
+        "actor": interaction.identity.actor_uri,
+        "object": interaction.playlist.object_uri,
+        "to": "as:Public",
+    }
+
+
+def _like_ap(interaction: PlaylistInteraction) -> dict:
+    return {
+        "type": "Like",
+        "id": interaction.object_uri,
+        "published": format_ld_date(interaction.published),
+        "actor": interaction.identity.actor_uri,
+        "object": interaction.playlist.object_uri,
+    }
+
+
+def _vote_ap(interaction: PlaylistInteraction) -> dict:
+    return {
+        "type": "Note",
+        "id": interaction.object_uri,
+        "to": interaction.playlist.author.actor_uri,
+        "name": interaction.value,
+        "inReplyTo": interaction.playlist.object_uri,
+        "attributedTo": interaction.identity.actor_uri,
+    }
+
+
+# Outbound AP builders by interaction type (pins have no AP object)
+_AP_BUILDERS = {
+    PlaylistInteraction.Types.boost.value: _announce_ap,
+    PlaylistInteraction.Types.like.value: _like_ap,
+    PlaylistInteraction.Types.vote.value: _vote_ap,
+}
+
+# Inbound AP activity types that map directly onto an interaction type
+_AP_TYPES = {
+    "like": PlaylistInteraction.Types.like,
+    "announce": PlaylistInteraction.Types.boost,
+}
@@ -64,6 +64,9 @@ class PlaylistItemStates(StateGraph):
                     subject_playlist=instance.playlist,
                     subject_playlist_interaction=instance,
                 )
+        # Track: there's nothing to federate for tracklist changes yet
+        elif instance.type == instance.Types.track:
+            pass
         else:
             raise ValueError("Cannot fan out unknown type")
         # And one for themselves if they're local and it's a boost
@@ -102,6 +105,8 @@ class PlaylistItemStates(StateGraph):
                 subject_playlist=instance.playlist,
                 subject_playlist_interaction=instance,
             )
+        elif instance.type == instance.Types.track:
+            pass
         else:
             raise ValueError("Cannot fan out unknown type")
         # And one for themselves if they're local and it's a boost
@@ -125,6 +130,7 @@ class PlaylistItem(StatorModel):
         boost = "boost"
         vote = "vote"
         pin = "pin"
+        track = "track"
 
     id = models.BigIntegerField(
         primary_key=True,
@@ -165,6 +171,25 @@ class PlaylistItem(StatorModel):
             "inAlbum" : self.album_name
         }
     
+    # Fields that identify which track an item refers to, in make_track_key order
+    TRACK_KEY_FIELDS = ("isrc", "name", "creator_name", "release_name", "upc", "isni")
+
+    @staticmethod
+    def make_track_key(isrc, name, creator_name, release_name, upc, isni) -> tuple:
+        """
+        Identifies a track; the ISRC is authoritative when present, otherwise
+        the descriptive fields have to match.
+        """
+        if isrc:
+            return ("isrc", isrc)
+        return (name, creator_name, release_name, upc, isni)
+
+    @property
+    def track_key(self) -> tuple:
+        return self.make_track_key(
+            *(getattr(self, field) for field in self.TRACK_KEY_FIELDS)
+        )
+
     def to_json(self):
         return {
             "@type": "PlaylistItem",
@@ -199,7 +224,24 @@ class PlaylistItem(StatorModel):
     updated = models.DateTimeField(auto_now=True)
 
     class Meta:
-        indexes = [models.Index(fields=["type", "identity", "playlist"])]
+        indexes = [
+            models.Index(fields=["type", "identity", "playlist"]),
+            # For the posting rate limit's latest-item lookup
+            models.Index(
+                fields=["identity", "created"],
+                name="ix_playlistite_identity_crtd",
+            ),
+        ]
+        constraints = [
+            # The index behind the ISRC lookups when upserting items. There's
+            # one row per operation, so upserts refresh created to keep
+            # get_delta's replay order right
+            models.UniqueConstraint(
+                fields=["playlist", "isrc", "type", "identity", "operation"],
+                condition=models.Q(isrc__isnull=False),
+                name="uq_playlistite_isrc",
+            ),
+        ]
 
     ### Display helpers ###
 
@@ -240,44 +282,48 @@ class PlaylistItem(StatorModel):
         When interaction is boost, only boost follows are considered,
         for pins all followers are considered.
         """
+        # Targets are kept as {id: (shared_inbox_uri, local)} while we work
+        # out who to send to, and only loaded as Identities at the end.
         # Start including the playlist author
-        targets = {self.playlist.author}
+        author = self.playlist.author
+        targets: dict[int, tuple[str | None, bool]] = {
+            author.pk: (author.shared_inbox_uri, author.local)
+        }
 
         query = self.identity.inbound_follows.active()
         # Include all followers that are following the boosts
         if self.type == self.Types.boost:
             query = query.filter(boosts=True)
-        for follow in query.select_related("source"):
-            targets.add(follow.source)
+        for source_id, shared_inbox_uri, local in query.values_list(
+            "source_id", "source__shared_inbox_uri", "source__local"
+        ):
+            targets[source_id] = (shared_inbox_uri, local)
 
         # Fetch the full blocks and remove them as targets
-        for block in (
+        for target_id in (
             self.identity.outbound_blocks.active()
             .filter(mute=False)
-            .select_related("target")
+            .values_list("target_id", flat=True)
         ):
-            try:
-                targets.remove(block.target)
-            except KeyError:
-                pass
-
-        deduped_targets = set()
-        shared_inboxes = set()
-        for target in targets:
-            if target.local:
+            targets.pop(target_id, None)
+
+        deduped_ids = set()
+        shared_inboxes: set[str] = set()
+        for target_id, (shared_inbox_uri, local) in targets.items():
+            if local:
                 # Local targets always gets the boosts
                 # despite its creator locality
-                deduped_targets.add(target)
+                deduped_ids.add(target_id)
             elif self.identity.local:
                 # Dedupe the targets based on shared inboxes
                 # (we only keep one per shared inbox)
-                if not target.shared_inbox_uri:
-                    deduped_targets.add(target)
-                elif target.shared_inbox_uri not in shared_inboxes:
-                    shared_inboxes.add(target.shared_inbox_uri)
-                    deduped_targets.add(target)
+                if not shared_inbox_uri:
+                    deduped_ids.add(target_id)
+                elif shared_inbox_uri not in shared_inboxes:
+                    shared_inboxes.add(shared_inbox_uri)
+                    deduped_ids.add(target_id)
 
-        return deduped_targets
+        return Identity.objects.filter(pk__in=deduped_ids).iterator()
 
     ### Create helpers ###
 
@@ -621,8 +667,9 @@ class PlaylistItem(StatorModel):
             "reblog": playlist_json,
         }
 
+    @classmethod
     def create_local(
-        self,
+        cls,
         playlist: Playlist,
         identity: Identity,
         type: str,
@@ -633,35 +680,36 @@ class PlaylistItem(StatorModel):
         isrc: str = None,
         upc: str = None,
         isni: str = None,
-        operation: str = None
+        operation: str = "add",
     ):
         playlist_item = None
         if isrc is not None:
-            playlist_item, created = PlaylistItem.objects.get_or_create(
+            # Reusing the row for a repeated operation moves it to now, so a
+            # re-add after a delete replays after that delete
+            playlist_item = cls.objects.update_or_create(
                 isrc=isrc,
                 playlist=playlist,
                 type=type,
                 identity=identity,
-                playlist=self.playlist,
                 operation=operation,
                 defaults=dict(
                     number=number,
                     name=name,
-                    artist_name=artist_name,
+                    creator_name=artist_name,
                     release_name=release_name,
                     upc=upc,
-                    isni=isni
+                    isni=isni,
+                    created=timezone.now(),
                 )
-            )
+            )[0]
         else:
-            playlist_item = PlaylistItem.objects.create(
+            playlist_item = cls.objects.create(
                 type=type,
                 playlist=playlist,
                 identity=identity,
-                playlist=self.playlist,
                 number=number,
                 name=name,
-                artist_name=artist_name,
+                creator_name=artist_name,
                 release_name=release_name,
                 upc=upc,
                 isni=isni,
@@ -671,4 +719,8 @@ class PlaylistItem(StatorModel):
 
         if playlist_item.state not in PlaylistItemStates.group_active():
             playlist_item.transition_perform(PlaylistItemStates.new)
-        self.playlist.calculate_stats()
+        # The tracklist has changed, so drop any memoized delta
+        playlist.__dict__.pop("delta", None)
+        Playlist.bump_ap_version(playlist.pk)
+        playlist.calculate_stats()
+        return playlist_item
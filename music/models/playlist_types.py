@@ -2,8 +2,9 @@ import json
 from datetime import datetime
 from typing import Literal
 
+import orjson
 from django.utils import timezone
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, root_validator
 
 from core.ld import format_ld_date
 
@@ -17,10 +18,12 @@ class QuestionOption(BaseModel):
     type: Literal["Note"] = "Note"
     votes: int = 0
 
-    def __init__(self, **data) -> None:
-        data["votes"] = data.get("votes", data.get("replies", {}).get("totalItems", 0))
-
-        super().__init__(**data)
+    @root_validator(pre=True)
+    def populate_votes(cls, values):
+        values["votes"] = values.get(
+            "votes", values.get("replies", {}).get("totalItems", 0)
+        )
+        return values
 
 
 class QuestionData(BasePlaylistDataType):
@@ -34,26 +37,27 @@ class QuestionData(BasePlaylistDataType):
         extra = "ignore"
         allow_population_by_field_name = True
 
-    def __init__(self, **data) -> None:
-        data["voter_count"] = data.get(
-            "voter_count", data.get("votersCount", data.get("toot:votersCount", 0))
+    @root_validator(pre=True)
+    def populate_voters_and_options(cls, values):
+        values["voter_count"] = values.get(
+            "voter_count", values.get("votersCount", values.get("toot:votersCount", 0))
         )
 
-        if "mode" not in data:
-            data["mode"] = "anyOf" if "anyOf" in data else "oneOf"
-        if "options" not in data:
-            options = data.pop("anyOf", None)
+        if "mode" not in values:
+            values["mode"] = "anyOf" if "anyOf" in values else "oneOf"
+        if "options" not in values:
+            options = values.pop("anyOf", None)
             if not options:
-                options = data.pop("oneOf", None)
-            data["options"] = options
-        super().__init__(**data)
+                options = values.pop("oneOf", None)
+            values["options"] = options
+        return values
 
     def to_mastodon_json(self, playlist, identity=None):
-        from activities.models import PlaylistInteraction
+        from music.models import PlaylistInteraction
 
         multiple = self.mode == "anyOf"
         value = {
-            "id": playlist.id,
+            "id": playlist.pk,
             "expires_at": None,
             "expired": False,
             "multiple": multiple,
@@ -82,13 +86,15 @@ class QuestionData(BasePlaylistDataType):
             option_map[option.name] = index
 
         if identity:
-            votes = playlist.interactions.filter(
-                identity=identity,
-                type=PlaylistInteraction.Types.vote,
+            votes = list(
+                playlist.playlist_interactions.filter(
+                    identity=identity,
+                    type=PlaylistInteraction.Types.vote,
+                ).values_list("value", flat=True)
             )
-            value["voted"] = playlist.author == identity or votes.exists()
+            value["voted"] = bool(votes)
             value["own_votes"] = [
-                option_map[vote.value] for vote in votes if vote.value in option_map
+                option_map[vote] for vote in votes if vote in option_map
             ]
 
         return value
@@ -110,6 +116,16 @@ class PlaylistTypeData(BaseModel):
 
 
 class PlaylistTypeDataEncoder(json.JSONEncoder):
+    def encode(self, obj):
+        # orjson can't do custom indentation or key skipping, so leave
+        # those to the standard library
+        if self.indent is not None or self.skipkeys:
+            return super().encode(obj)
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
     def default(self, obj):
         if isinstance(obj, BasePlaylistDataType):
             return obj.dict()
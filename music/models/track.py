@@ -75,14 +75,26 @@ class Recording(Entity):
 
 class Track(Entity):
     recording = models.ForeignKey(Recording, on_delete=models.CASCADE, related_name='+')
-    release = models.ForeignKey(Release, on_delete=models.CASCADE, reated_name='+')
+    release = models.ForeignKey(Release, on_delete=models.CASCADE, related_name='+')
     number = models.IntegerField(default=0)
 
+    @classmethod
+    def with_json_prefetch(cls, queryset, prefix=""):
+        """
+        Joins and prefetches everything to_json reads. prefix is the lookup
+        path to the Track from the queryset's model, e.g. "track__".
+        """
+        return queryset.select_related(
+            f"{prefix}recording", f"{prefix}release"
+        ).prefetch_related(
+            f"{prefix}recording__creators", f"{prefix}release__creators"
+        )
+
     def to_json(self):
         return {
             "type": "Track",
             "type": "track",
             "number": self.number,
-            "release": self.release.to_dict(),
-            "recording": self.recording.to_dict(),
+            "release": self.release.to_json(),
+            "recording": self.recording.to_json(),
         }
@@ -1,4 +1,10 @@
+import itertools
 import logging
+from collections import defaultdict
+
+from django.db import connections, models, router, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
 
 from music.models import (
     Playlist,
@@ -6,35 +12,99 @@ from music.models import (
     PlaylistInteractionStates,
     PlaylistStates
 )
-from activities.models import TimelineEvent
 from music.models.playlist_item import PlaylistItem, PlaylistItemStates
 
 from users.models import Identity
 
 logger = logging.getLogger(__name__)
 
+# State name sets, built once. These hold names rather than State objects,
+# as States hash by identity and so wouldn't match the string in a model's
+# state field.
+_ACTIVE_ITEM_STATES = frozenset(state.name for state in PlaylistItemStates.group_active())
+_ACTIVE_INTERACTION_STATES = frozenset(
+    state.name for state in PlaylistInteractionStates.group_active()
+)
+# Spelled out so importing this module never depends on the state graph's
+# attributes (the URLconf imports it via the views)
+_DELETED_STATES = frozenset(["deleted", "deleted_fanned_out"])
+
 
 class PlaylistService:
     """
     High-level operations on Playlists
     """
 
+    # Built once by queryset() and cloned on each call
+    _base_queryset = None
+
+    # How many items to write per query in bulk_upsert_items
+    BULK_UPSERT_BATCH_SIZE = 500
+
+    # The PlaylistItem fields bulk_upsert_items updates on existing rows
+    BULK_UPSERT_FIELDS = [
+        "number",
+        "name",
+        "creator_name",
+        "release_name",
+        "upc",
+        "isni",
+    ]
+
     @classmethod
     def queryset(cls):
         """
         Returns the base queryset to use for fetching playlists efficiently.
         """
-        return (
-            Playlist.objects.not_hidden()
-            .prefetch_related(
-                "attachments",
-                "mentions",
-                "emojis",
-            )
-            .select_related(
-                "author",
-                "author__domain",
+        if cls._base_queryset is None:
+            cls._base_queryset = (
+                Playlist.objects.not_hidden()
+                .prefetch_related(
+                    "playlist_attachments",
+                    "mentions",
+                    "emojis",
+                    # The raw add/delete operations, in the order
+                    # Playlist.tracklist replays them, with what the
+                    # playlist template shows for each item
+                    Prefetch(
+                        "music_items",
+                        queryset=PlaylistItem.objects.filter(
+                            state__in=_ACTIVE_ITEM_STATES
+                        )
+                        .select_related("identity")
+                        .order_by("created")
+                        .only(
+                            "id",
+                            "playlist_id",
+                            "operation",
+                            "number",
+                            *PlaylistItem.TRACK_KEY_FIELDS,
+                            "identity__username",
+                            "identity__domain",
+                        ),
+                        to_attr="item_operations",
+                    ),
+                )
+                .select_related(
+                    "author",
+                    "author__domain",
+                )
             )
+        return cls._base_queryset.all()
+
+    @classmethod
+    def light_queryset(cls):
+        """
+        Returns a narrow queryset with just the fields needed to walk reply
+        trees, for when the playlists themselves won't be displayed.
+        """
+        return Playlist.objects.not_hidden().only(
+            "pk",
+            "object_uri",
+            "in_reply_to",
+            "state",
+            "published",
+            "visibility",
         )
 
     def __init__(self, playlist: Playlist):
@@ -51,45 +121,132 @@ class PlaylistService:
         isrc: str = None,
         upc: str = None,
         isni: str = None,
-        operation: str = None
+        operation: str = "add",
+        defer_stats: bool = False,
     ):
-        playlist_item = None
+        """
+        Adds or updates an item on this Playlist.
+
+        Pass defer_stats=True when upserting many items, and call
+        recalculate_stats() once at the end.
+        """
+        fields = dict(
+            number=number,
+            name=name,
+            creator_name=artist_name,
+            release_name=release_name,
+            upc=upc,
+            isni=isni,
+        )
         if isrc is not None:
-            playlist_item, created = PlaylistItem.objects.get_or_create(
+            # New items are created directly in the "new" state, so only
+            # previously undone items need a transition afterwards. A reused
+            # row is moved to now so get_delta replays it in the right place.
+            playlist_item = PlaylistItem.objects.update_or_create(
                 isrc=isrc,
                 type=type,
                 identity=identity,
                 playlist=self.playlist,
                 operation=operation,
-                defaults=dict(
-                    number=number,
-                    name=name,
-                    artist_name=artist_name,
-                    release_name=release_name,
-                    upc=upc,
-                    isni=isni
-                )
-            )
+                defaults={**fields, "created": timezone.now()},
+            )[0]
+            if playlist_item.state not in _ACTIVE_ITEM_STATES:
+                playlist_item.transition_perform(PlaylistItemStates.new)
         else:
-            playlist_item = PlaylistItem.objects.create(
+            # Without an ISRC there's nothing to match on, so always add
+            PlaylistItem.objects.create(
                 type=type,
                 identity=identity,
                 playlist=self.playlist,
-                number=number,
-                name=name,
-                artist_name=artist_name,
-                release_name=release_name,
-                upc=upc,
-                isni=isni,
-                isrc=isrc,
-                operation=operation
-            )  
+                operation=operation,
+                **fields,
+            )
+        # The tracklist has changed, so drop any memoized delta
+        self.playlist.__dict__.pop("delta", None)
+        Playlist.bump_ap_version(self.playlist.pk)
+        if not defer_stats:
+            self.playlist.calculate_stats()
+
+    def bulk_upsert_items(
+        self, identity: Identity, items: list[dict]
+    ) -> list[PlaylistItem]:
+        """
+        Adds or updates many items on this Playlist in a fixed number of
+        queries, however many items there are.
+
+        Each item is a dict of upsert_item_to_playlist's keyword arguments.
+        As there, items with an ISRC replace the existing row with the same
+        ISRC, type and operation, and items without one are always added.
+        """
+        now = timezone.now()
+        # Later entries for the same track win, as they would one at a time
+        upserts = {}
+        for index, item in enumerate(items):
+            item = {"operation": "add", **item}
+            item["creator_name"] = item.pop("artist_name", "")
+            key = (
+                (item["isrc"], item["type"], item["operation"])
+                if item.get("isrc") is not None
+                else index
+            )
+            upserts[key] = item
+        # Match ISRC items against existing rows with a single lookup (the
+        # ISRC constraint is partial, so ON CONFLICT can't target it)
+        existing = {
+            (row.isrc, row.type, row.operation): row
+            for row in PlaylistItem.objects.filter(
+                playlist=self.playlist,
+                identity=identity,
+                isrc__in={key[0] for key in upserts if isinstance(key, tuple)},
+            )
+        }
+        to_update = []
+        to_create = []
+        for key, item in upserts.items():
+            playlist_item = existing.get(key)
+            if playlist_item is None:
+                to_create.append(
+                    PlaylistItem(playlist=self.playlist, identity=identity, **item)
+                )
+            else:
+                for field, value in item.items():
+                    setattr(playlist_item, field, value)
+                # Move it to now so get_delta replays it in the right place
+                playlist_item.created = now
+                to_update.append(playlist_item)
+        with transaction.atomic():
+            PlaylistItem.objects.bulk_update(
+                to_update,
+                [*self.BULK_UPSERT_FIELDS, "created"],
+                batch_size=self.BULK_UPSERT_BATCH_SIZE,
+            )
+            # Previously undone items come back as new
+            PlaylistItem.transition_perform_queryset(
+                PlaylistItem.objects.filter(
+                    pk__in=[
+                        playlist_item.pk
+                        for playlist_item in to_update
+                        if playlist_item.state not in _ACTIVE_ITEM_STATES
+                    ]
+                ),
+                PlaylistItemStates.new,
+            )
+            PlaylistItem.objects.bulk_create(
+                to_create, batch_size=self.BULK_UPSERT_BATCH_SIZE
+            )
+        # The tracklist has changed, so drop any memoized delta
+        self.playlist.__dict__.pop("delta", None)
+        Playlist.bump_ap_version(self.playlist.pk)
+        self.recalculate_stats()
+        return to_update + to_create
 
-        if playlist_item.state not in PlaylistItemStates.group_active():
-            playlist_item.transition_perform(PlaylistItemStates.new)
+    def recalculate_stats(self):
+        """
+        Recalculates this Playlist's stats, for use after deferred updates
+        """
         self.playlist.calculate_stats()
 
-    def interact_as(self, identity: Identity, type: str):
+    def interact_as(self, identity: Identity, type: str, defer_stats: bool = False):
         """
         Performs an interaction on this Playlist
         """
@@ -98,21 +255,28 @@ class PlaylistService:
             identity=identity,
             playlist=self.playlist,
         )[0]
-        if interaction.state not in PlaylistInteractionStates.group_active():
+        if interaction.state not in _ACTIVE_INTERACTION_STATES:
             interaction.transition_perform(PlaylistInteractionStates.new)
-        self.playlist.calculate_stats()
+        Playlist.bump_ap_version(self.playlist.pk)
+        if not defer_stats:
+            self.playlist.calculate_stats()
 
-    def uninteract_as(self, identity, type):
+    def uninteract_as(self, identity, type, defer_stats: bool = False):
         """
         Undoes an interaction on this Playlist
         """
-        for interaction in PlaylistInteraction.objects.filter(
-            type=type,
-            identity=identity,
-            playlist=self.playlist,
-        ):
-            interaction.transition_perform(PlaylistInteractionStates.undone)
-        self.playlist.calculate_stats()
+        PlaylistInteraction.transition_perform_queryset(
+            PlaylistInteraction.objects.filter(
+                type=type,
+                identity=identity,
+                playlist=self.playlist,
+                state__in=_ACTIVE_INTERACTION_STATES,
+            ),
+            PlaylistInteractionStates.undone,
+        )
+        Playlist.bump_ap_version(self.playlist.pk)
+        if not defer_stats:
+            self.playlist.calculate_stats()
 
     def like_as(self, identity: Identity):
         self.interact_as(identity, PlaylistInteraction.Types.like)
@@ -136,18 +300,28 @@ class PlaylistService:
         Returns ancestor/descendant information.
 
         Ancestors are guaranteed to be in order from closest to furthest.
-        Descendants are in depth-first order, starting with closest.
+        Descendants are in breadth-first order, starting with closest.
 
         If identity is provided, includes mentions/followers-only playlists they
         can see. Otherwise, shows unlisted and above only.
         """
-        # Retrieve ancestors via parent walk
+        # Retrieve ancestors via parent walk, resolved in one recursive query
         ancestors: list[Playlist] = []
         ancestor = self.playlist
+        ancestors_by_uri: dict[str, Playlist] = {}
+        if ancestor.in_reply_to and num_ancestors > 0:
+            ancestors_by_uri = {
+                playlist.object_uri: playlist
+                for playlist in self.queryset().filter(
+                    object_uri__in=self._fetch_ancestor_uris(
+                        ancestor.in_reply_to, num_ancestors
+                    )
+                )
+            }
         while ancestor.in_reply_to and len(ancestors) < num_ancestors:
             object_uri = ancestor.in_reply_to
             reason = ancestor.object_uri
-            ancestor = self.queryset().filter(object_uri=object_uri).first()
+            ancestor = ancestors_by_uri.get(object_uri)
             if ancestor is None:
                 try:
                     Playlist.ensure_object_uri(object_uri, reason=reason)
@@ -156,43 +330,120 @@ class PlaylistService:
                         f"Cannot fetch ancestor Playlist={self.playlist.pk}, ancestor_uri={object_uri}"
                     )
                 break
-            if ancestor.state in [PlaylistStates.deleted, PlaylistStates.deleted_fanned_out]:
+            if ancestor.state in _DELETED_STATES:
                 break
             ancestors.append(ancestor)
-        # Retrieve descendants via breadth-first-search
-        descendants: list[Playlist] = []
-        queue = [self.playlist]
-        seen: set[str] = set()
-        while queue and len(descendants) < num_descendants:
-            node = queue.pop()
-            child_queryset = (
-                self.queryset()
-                .filter(in_reply_to=node.object_uri)
-                .order_by("published")
+        if num_descendants <= 0:
+            return ancestors, []
+        # Retrieve descendants via breadth-first-search, one query per level.
+        # For a leaf playlist this is a single narrow query that comes back
+        # empty, which is as cheap as an exists() probe would be.
+        # The walk only needs the tree structure; the playlists that make the
+        # cut are loaded in full afterwards in a single query
+        children_queryset = (
+            self.light_queryset()
+            .exclude(state__in=_DELETED_STATES)
+            .order_by("published")
+        )
+        if identity:
+            children_queryset = children_queryset.visible_to(
+                identity=identity, include_replies=True
             )
-            if identity:
-                child_queryset = child_queryset.visible_to(
-                    identity=identity, include_replies=True
-                )
-            else:
-                child_queryset = child_queryset.unlisted(include_replies=True)
-            for child in child_queryset:
-                if child.pk not in seen:
-                    descendants.append(child)
-                    queue.append(child)
-                    seen.add(child.pk)
+        else:
+            children_queryset = children_queryset.unlisted(include_replies=True)
+
+        def children_by_parent(level):
+            children = defaultdict(list)
+            for child in children_queryset.filter(
+                in_reply_to__in=[node.object_uri for node in level]
+            ):
+                children[child.in_reply_to].append(child)
+            return children
+
+        descendants = self._walk_descendants(
+            self.playlist, children_by_parent, num_descendants
+        )
+        if descendants:
+            full_descendants = self.queryset().in_bulk(
+                [descendant.pk for descendant in descendants]
+            )
+            descendants = [
+                full_descendants[descendant.pk]
+                for descendant in descendants
+                if descendant.pk in full_descendants
+            ]
         return ancestors, descendants
 
+    @staticmethod
+    def _walk_descendants(root, children_by_parent, limit: int) -> list:
+        """
+        Returns up to `limit` descendants of root in breadth-first order,
+        closest first. children_by_parent is called with each level's nodes
+        and returns their children as {parent object_uri: [children]}.
+        """
+        descendants = []
+        current_level = [root]
+        seen = set()
+        while current_level and len(descendants) < limit:
+            children = children_by_parent(current_level)
+            next_level = []
+            # Stop as soon as we hit the cap, rather than finishing the level
+            unseen_children = (
+                child
+                for node in current_level
+                for child in children[node.object_uri]
+                if child.pk not in seen
+            )
+            for child in itertools.islice(unseen_children, limit - len(descendants)):
+                descendants.append(child)
+                next_level.append(child)
+                seen.add(child.pk)
+            current_level = next_level
+        return descendants
+
+    @staticmethod
+    def _fetch_ancestor_uris(
+        object_uri: str, limit: int, model: type[models.Model] = Playlist
+    ) -> list[str]:
+        """
+        Returns the object URIs of up to `limit` rows of model found by
+        following in_reply_to upwards from object_uri (inclusive), closest
+        first.
+        """
+        connection = connections[router.db_for_read(model)]
+        quote_name = connection.ops.quote_name
+        table = quote_name(model._meta.db_table)
+        object_uri_column = quote_name(model._meta.get_field("object_uri").column)
+        in_reply_to_column = quote_name(model._meta.get_field("in_reply_to").column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH RECURSIVE ancestors (object_uri, in_reply_to, depth) AS (
+                    SELECT {object_uri_column}, {in_reply_to_column}, 1
+                    FROM {table}
+                    WHERE {object_uri_column} = %s
+                    UNION ALL
+                    SELECT p.{object_uri_column}, p.{in_reply_to_column}, a.depth + 1
+                    FROM {table} p
+                    JOIN ancestors a ON p.{object_uri_column} = a.in_reply_to
+                    WHERE a.depth < %s
+                )
+                SELECT object_uri FROM ancestors ORDER BY depth
+                """,
+                [object_uri, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
     def delete(self):
         """
-        Marks a playlist as deleted and immediately cleans up its timeline events etc.
+        Marks a playlist as deleted and undoes its interactions. Its timeline
+        events are cleaned up in the background by the deleted state handler.
         """
         self.playlist.transition_perform(PlaylistStates.deleted)
-        TimelineEvent.objects.filter(subject_playlist=self.playlist).delete()
         PlaylistInteraction.transition_perform_queryset(
             PlaylistInteraction.objects.filter(
                 playlist=self.playlist,
-                state__in=PlaylistInteractionStates.group_active(),
+                state__in=_ACTIVE_INTERACTION_STATES,
             ),
             PlaylistInteractionStates.undone,
         )
@@ -202,11 +453,15 @@ class PlaylistService:
             raise ValueError("Not the author of this playlist")
         if self.playlist.visibility == Playlist.Visibilities.mentioned:
             raise ValueError("Cannot pin a mentioned-only playlist")
+        # Only fetch up to the limit rather than counting every pin
         if (
-            PlaylistInteraction.objects.filter(
-                type=PlaylistInteraction.Types.pin,
-                identity=identity,
-            ).count()
+            len(
+                PlaylistInteraction.objects.filter(
+                    type=PlaylistInteraction.Types.pin,
+                    identity=identity,
+                    state__in=_ACTIVE_INTERACTION_STATES,
+                ).values_list("pk", flat=True)[:5]
+            )
             >= 5
         ):
             raise ValueError("Maximum number of pins already reached")
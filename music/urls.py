@@ -1,12 +1,52 @@
 from django.urls import path
-from .views.playlists import create
-from .views import playlists
-from .views.playlists.items import upsert
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+app_name = "music"
+
+
+class LazyView:
+    """
+    A view that only imports the given class-based view (and everything its
+    module pulls in) the first time it's used, while still exposing what
+    as_view() would for the CSRF middleware and URL introspection.
+    """
+
+    def __init__(self, view_path: str, **initkwargs):
+        self.view_path = view_path
+        self.view_initkwargs = initkwargs
+
+    @cached_property
+    def view_class(self):
+        return import_string(self.view_path)
+
+    @cached_property
+    def view(self):
+        return self.view_class.as_view(**self.view_initkwargs)
+
+    @property
+    def csrf_exempt(self):
+        # Read by the CSRF middleware just before the view is called, so
+        # importing here costs nothing extra
+        return getattr(self.view, "csrf_exempt", False)
+
+    def __call__(self, request, *args, **kwargs):
+        return self.view(request, *args, **kwargs)
 
-app_name = 'music'
 
 urlpatterns = [
-    path("@<handle>/playlists/create", create.Create.as_view(), name="create"),
-    path("@<handle>/playlists/<int:post_id>/", playlists.Individual.as_view()),
-    path("@<handle>/playlists/<int:post_id>/upsert", upsert.Upsert.as_view(), name="upsert"),
+    path(
+        "@<handle>/playlists/create",
+        LazyView("music.views.playlists.create.Create"),
+        name="create",
+    ),
+    path(
+        "@<handle>/playlists/<int:playlist_id>/",
+        LazyView("music.views.playlists.Individual"),
+    ),
+    path(
+        "@<handle>/playlists/<int:playlist_id>/upsert",
+        LazyView("music.views.playlists.items.upsert.Upsert"),
+        name="upsert",
+    ),
 ]
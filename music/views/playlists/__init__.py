@@ -1,4 +1,6 @@
-from django.http import Http404, JsonResponse
+import orjson
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.utils.decorators import method_decorator
 from django.views.decorators.vary import vary_on_headers
@@ -66,7 +68,17 @@ class Individual(TemplateView):
         # If this not a local playlist, redirect to its canonical URI
         if not self.playlist_obj.local:
             return redirect(self.playlist_obj.object_uri)
-        return JsonResponse(
-            canonicalise(self.playlist_obj.to_ap(), include_security=True),
-            content_type="application/activity+json",
+        # Cache the AP JSON keyed on the last update, plus a version that's
+        # bumped when its items, attachments or interactions change
+        cache_key = (
+            f"playlist_ap:{self.playlist_obj.pk}:"
+            f"{int(self.playlist_obj.updated.timestamp())}:"
+            f"{self.playlist_obj.ap_version}"
         )
+        body = cache.get(cache_key)
+        if body is None:
+            body = orjson.dumps(
+                canonicalise(self.playlist_obj.to_ap(), include_security=True)
+            )
+            cache.set(cache_key, body, timeout=300)
+        return HttpResponse(body, content_type="application/activity+json")
@@ -1,14 +1,16 @@
 from django import forms
 from django.conf import settings
 from django.contrib import messages
-from django.shortcuts import redirect
+from django.db import transaction
+from django.http import HttpResponseRedirect
 from django.utils import timezone
 from django.views.generic import FormView
 
 from activities.models import TimelineEvent
 
 from ...models import Playlist, PlaylistAttachment, PlaylistAttachmentStates
-from core.files import blurhash_image, resize_image
+from .widgets import character_counter_attrs
+from core.files import blurhash_image, open_image, resize_image
 from core.models import Config
 from users.views.base import IdentityViewMixin
 
@@ -31,6 +33,9 @@ class Create(IdentityViewMixin, FormView):
                 attrs={
                     "autofocus": "autofocus",
                     "placeholder": "Enter a description",
+                    **character_counter_attrs(
+                        Config.lazy_system_value("post_length"), "playlist-button"
+                    ),
                 },
             )
         )
@@ -91,41 +96,25 @@ class Create(IdentityViewMixin, FormView):
         def __init__(self, identity, *args, **kwargs):
             super().__init__(*args, **kwargs)
             self.identity = identity
-            self.fields["description"].widget.attrs[
-                "_"
-            ] = rf"""
-                init
-                    -- Move cursor to the end of existing text
-                    set my.selectionStart to my.value.length
-                end
-
-                on load or input
-                -- Unicode-aware counting to match Python
-                -- <LF> will be normalized as <CR><LF> in Django
-                set characters to Array.from(my.value.replaceAll('\n','\r\n').trim()).length
-                put {Config.system.post_length} - characters into #character-counter
-
-                if characters > {Config.system.post_length} then
-                    set #character-counter's style.color to 'var(--color-text-error)'
-                    add [@disabled=] to #playlist-button
-                else
-                    set #character-counter's style.color to ''
-                    remove @disabled from #playlist-button
-                end
-            """
 
         def clean_text(self):
             text = self.cleaned_data.get("text")
-            # Check minimum interval
-            last_playlist = self.identity.playlists.order_by("-created").first()
-            if (
-                last_playlist
-                and (timezone.now() - last_playlist.created).total_seconds()
-                < Config.system.playlist_minimum_interval
-            ):
-                raise forms.ValidationError(
-                    f"You must wait at least {Config.system.playlist_minimum_interval} seconds between playlists"
+            # Check minimum interval (no need to look anything up if there's none)
+            minimum_interval = Config.system.playlist_minimum_interval
+            if minimum_interval > 0:
+                last_created = (
+                    self.identity.playlists.order_by("-created")
+                    .values_list("created", flat=True)
+                    .first()
                 )
+                if (
+                    last_created
+                    and (timezone.now() - last_created).total_seconds()
+                    < minimum_interval
+                ):
+                    raise forms.ValidationError(
+                        f"You must wait at least {minimum_interval} seconds between playlists"
+                    )
             if not text:
                 return text
             # Check playlist length
@@ -140,8 +129,7 @@ class Create(IdentityViewMixin, FormView):
             value = self.cleaned_data.get("image")
             if value:
                 max_mb = settings.SETUP.MEDIA_MAX_IMAGE_FILESIZE_MB
-                max_bytes = max_mb * 1024 * 1024
-                if value.size > max_bytes:
+                if value.size > max_mb * 1024 * 1024:
                     # Erase the file from our data to stop trying to show it again
                     self.files = {}
                     raise forms.ValidationError(
@@ -158,53 +146,61 @@ class Create(IdentityViewMixin, FormView):
         return initial
 
     def form_valid(self, form):
-        # See if we need to make an image attachment
-        attachments = []
-        if form.cleaned_data.get("image"):
+        with transaction.atomic():
+            # Create the playlist
+            playlist = Playlist.create_local(
+                author=self.identity,
+                name=form.cleaned_data["name"],
+                description=form.cleaned_data["description"],
+                summary=form.cleaned_data.get("content_warning"),
+                visibility=form.cleaned_data["visibility"],
+            )
+            # Resizing the image is the slow part, so keep it out of the
+            # playlist's transaction
+            if form.cleaned_data.get("image"):
+                transaction.on_commit(
+                    lambda: self.attach_image(
+                        playlist,
+                        form.cleaned_data["image"],
+                        form.cleaned_data.get("image_caption"),
+                    )
+                )
+
+        # Add their own timeline event for immediate visibility
+        TimelineEvent.add_playlist(self.identity, playlist)
+        messages.success(self.request, "Your playlist was created.")
+        return HttpResponseRedirect(self.request.path)
+
+    def attach_image(self, playlist, image, caption):
+        """
+        Makes an image attachment on the playlist from an uploaded file
+        """
+        # Decode the upload once for both sizes
+        with open_image(image) as decoded:
             main_file = resize_image(
-                form.cleaned_data["image"],
+                decoded,
                 size=(2000, 2000),
                 cover=False,
             )
             thumbnail_file = resize_image(
-                form.cleaned_data["image"],
+                decoded,
                 size=(400, 225),
                 cover=True,
             )
-            attachment = PlaylistAttachment.objects.create(
-                blurhash=blurhash_image(thumbnail_file),
-                mimetype="image/webp",
-                width=main_file.image.width,
-                height=main_file.image.height,
-                name=form.cleaned_data.get("image_caption"),
-                state=PlaylistAttachmentStates.fetched,
-                author=self.identity,
-            )
-            attachment.file.save(
-                main_file.name,
-                main_file,
-            )
-            attachment.thumbnail.save(
-                thumbnail_file.name,
-                thumbnail_file,
-            )
-            attachment.save()
-            attachments.append(attachment)
-
-        # Create the playlist
-        playlist = Playlist.create_local(
+        attachment = PlaylistAttachment(
+            playlist=playlist,
+            blurhash=blurhash_image(thumbnail_file),
+            mimetype="image/webp",
+            width=main_file.image.width,
+            height=main_file.image.height,
+            name=caption,
+            state=PlaylistAttachmentStates.fetched,
             author=self.identity,
-            name=form.cleaned_data["name"],
-            description=form.cleaned_data["description"],
-            summary=form.cleaned_data.get("content_warning"),
-            visibility=form.cleaned_data["visibility"],
-            attachments=attachments,
         )
-
-        # Add their own timeline event for immediate visibility
-        TimelineEvent.add_playlist(self.identity, playlist)
-        messages.success(self.request, "Your playlist was created.")
-        return redirect(".")
+        # Save the files without saving the model, then write it once
+        attachment.file.save(main_file.name, main_file, save=False)
+        attachment.thumbnail.save(thumbnail_file.name, thumbnail_file, save=False)
+        attachment.save()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
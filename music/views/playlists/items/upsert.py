@@ -1,15 +1,20 @@
+import json
+
 from django import forms
-from django.conf import settings
 from django.contrib import messages
-from django.shortcuts import redirect
+from django.core.validators import RegexValidator
+from django.db import transaction
+from django.db.models import Max
+from django.http import HttpResponseBadRequest, HttpResponseRedirect, JsonResponse
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.views.generic import FormView
 
-from activities.models import TimelineEvent
 from ....models import PlaylistItem
-from core.files import blurhash_image, resize_image
+from activities.models import TimelineEvent
 from core.models import Config
 from music.models.playlist import Playlist
+from music.services.playlist import PlaylistService
 from users.views.base import IdentityViewMixin
 
 
@@ -18,7 +23,7 @@ class Upsert(IdentityViewMixin, FormView):
 
     class form_class(forms.Form):
         name = forms.CharField(
-            widget=forms.Textarea(
+            widget=forms.TextInput(
                 attrs={
                     "autofocus": "autofocus",
                     "placeholder": "Track name",
@@ -26,7 +31,7 @@ class Upsert(IdentityViewMixin, FormView):
             )
         )
         artist_name = forms.CharField(
-            widget=forms.Textarea(
+            widget=forms.TextInput(
                 attrs={
                     "autofocus": "autofocus",
                     "placeholder": "Name of artist",
@@ -34,7 +39,7 @@ class Upsert(IdentityViewMixin, FormView):
             )
         )
         release_name = forms.CharField(
-            widget=forms.Textarea(
+            widget=forms.TextInput(
                 attrs={
                     "autofocus": "autofocus",
                     "placeholder": "Name of release",
@@ -42,102 +47,112 @@ class Upsert(IdentityViewMixin, FormView):
             )
         )
         isrc = forms.CharField(
-            widget=forms.Textarea(
+            max_length=12,
+            validators=[
+                RegexValidator(
+                    r"^[A-Z]{2}[A-Z0-9]{3}\d{7}$", message="Invalid ISRC code"
+                )
+            ],
+            widget=forms.TextInput(
                 attrs={
                     "autofocus": "autofocus",
                     "placeholder": "ISRC code",
                 },
-            )
+            ),
         )
 
         def __init__(self, identity, *args, **kwargs):
             super().__init__(*args, **kwargs)
             self.identity = identity
-            self.fields["text"].widget.attrs[
-                "_"
-            ] = rf"""
-                init
-                    -- Move cursor to the end of existing text
-                    set my.selectionStart to my.value.length
-                end
-
-                on load or input
-                -- Unicode-aware counting to match Python
-                -- <LF> will be normalized as <CR><LF> in Django
-                set characters to Array.from(my.value.replaceAll('\n','\r\n').trim()).length
-                put {Config.system.playlist_item_length} - characters into #character-counter
 
-                if characters > {Config.system.playlist_item_length} then
-                    set #character-counter's style.color to 'var(--color-text-error)'
-                    add [@disabled=] to #playlist_item-button
-                else
-                    set #character-counter's style.color to ''
-                    remove @disabled from #playlist_item-button
-                end
-            """
-
-        def clean_text(self):
-            text = self.cleaned_data.get("text")
-            # Check minimum interval
-            last_playlist_item = self.identity.playlist_items.order_by("-created").first()
-            if (
-                last_playlist_item
-                and (timezone.now() - last_playlist_item.created).total_seconds()
-                < Config.system.playlist_item_minimum_interval
-            ):
-                raise forms.ValidationError(
-                    f"You must wait at least {Config.system.playlist_item_minimum_interval} seconds between playlist_items"
-                )
-            if not text:
-                return text
-            # Check playlist_item length
-            length = len(text)
-            if length > Config.system.playlist_item_length:
-                raise forms.ValidationError(
-                    f"Maximum playlist_item length is {Config.system.playlist_item_length} characters (you have {length})"
-                )
-            return text
-
-        def clean_image(self):
-            value = self.cleaned_data.get("image")
-            if value:
-                max_mb = settings.SETUP.MEDIA_MAX_IMAGE_FILESIZE_MB
-                max_bytes = max_mb * 1024 * 1024
-                if value.size > max_bytes:
-                    # Erase the file from our data to stop trying to show it again
-                    self.files = {}
+        def clean(self):
+            cleaned_data = super().clean()
+            # Check minimum interval (no need to look anything up if there's none)
+            minimum_interval = Config.system.playlist_item_minimum_interval
+            if minimum_interval > 0:
+                last_created = self.identity.playlist_items.aggregate(
+                    last_created=Max("created")
+                )["last_created"]
+                if (
+                    last_created
+                    and (timezone.now() - last_created).total_seconds()
+                    < minimum_interval
+                ):
                     raise forms.ValidationError(
-                        f"File must be {max_mb}MB or less (actual: {value.size / 1024 ** 2:.2f})"
+                        f"You must wait at least {minimum_interval} seconds between playlist_items"
                     )
-            return value
+            return cleaned_data
+
+    def post_identity_setup(self):
+        self.playlist = get_object_or_404(Playlist, pk=self.kwargs["playlist_id"])
 
     def get_form(self, form_class=None):
         return self.form_class(identity=self.identity, **self.get_form_kwargs())
 
-    def get_initial(self):
-        initial = super().get_initial()
-        initial["visibility"] = self.identity.config_identity.default_playlist_item_visibility
-        return initial
+    def post(self, request, *args, **kwargs):
+        # API clients can send a whole batch as {"items": [{...}, ...]}
+        if request.content_type == "application/json":
+            return self.post_items(request)
+        return super().post(request, *args, **kwargs)
 
-    def form_valid(self, form):
-        # See if we need to make an image attachment
-        attachments = []
-        # Create the playlist_item
-        playlist_item = PlaylistItem.create_local(
-            author=self.identity,
-            content=form.cleaned_data["text"],
-            summary=form.cleaned_data.get("content_warning"),
-            visibility=form.cleaned_data["visibility"],
-            attachments=attachments,
+    def post_items(self, request):
+        """
+        Validates every item in a JSON batch with the item form, then adds
+        them all in one bulk upsert.
+        """
+        try:
+            items = json.loads(request.body)["items"]
+        except (ValueError, KeyError, TypeError):
+            return HttpResponseBadRequest("Expected a JSON body with an items list")
+        if not isinstance(items, list):
+            return HttpResponseBadRequest("Expected a JSON body with an items list")
+        forms = [self.form_class(identity=self.identity, data=item) for item in items]
+        errors = {
+            index: form.errors
+            for index, form in enumerate(forms)
+            if not form.is_valid()
+        }
+        if errors:
+            return JsonResponse({"errors": errors}, status=400)
+        playlist_items = PlaylistService(self.playlist).bulk_upsert_items(
+            self.identity,
+            [{"type": PlaylistItem.Types.track, **form.cleaned_data} for form in forms],
         )
-        # Add their own timeline event for immediate visibility
-        TimelineEvent.add_playlist_item(self.identity, playlist_item)
-        messages.success(self.request, "Your playlist_item was created.")
-        return redirect(".")
+        if playlist_items:
+            transaction.on_commit(
+                lambda: TimelineEvent.add_playlist_item(
+                    self.identity, playlist_items[-1]
+                )
+            )
+        return JsonResponse({"items": [str(item.pk) for item in playlist_items]})
+
+    def form_valid(self, form):
+        with transaction.atomic():
+            # Add the track to the playlist (or update it if it's already on)
+            playlist_item = PlaylistItem.create_local(
+                playlist=self.playlist,
+                identity=self.identity,
+                type=PlaylistItem.Types.track,
+                name=form.cleaned_data["name"],
+                artist_name=form.cleaned_data["artist_name"],
+                release_name=form.cleaned_data["release_name"],
+                isrc=form.cleaned_data["isrc"],
+            )
+            # Add their own timeline event for immediate visibility, once the
+            # item itself is committed so the insert stays short
+            transaction.on_commit(
+                lambda: TimelineEvent.add_playlist_item(self.identity, playlist_item)
+            )
+            # Only tell the user it worked once it actually has
+            transaction.on_commit(
+                lambda: messages.success(
+                    self.request, "Your playlist_item was created."
+                )
+            )
+        return HttpResponseRedirect(self.request.path)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["identity"] = self.identity
         context["section"] = "upsert_playlist_item"
         return context
-
@@ -0,0 +1,45 @@
+# Live character counter for a text box. The length limit and the button to
+# disable come from data attributes, so the script itself never changes.
+CHARACTER_COUNTER_HYPERSCRIPT = r"""
+init
+    -- Move cursor to the end of existing text
+    set my.selectionStart to my.value.length
+end
+
+on load or input
+set limit to my @data-max-length as Int
+set button to document.getElementById(my @data-submit-button)
+-- Unicode-aware counting to match Python
+-- <LF> will be normalized as <CR><LF> in Django
+set text to my.value
+js(text)
+    const trimmed = text.trim()
+    if (!/[\uD800-\uDBFF]/.test(trimmed)) {
+        // No surrogate pairs, so the UTF-16 length is the code point count
+        return trimmed.length + trimmed.split('\n').length - 1
+    }
+    return Array.from(text.replaceAll('\n','\r\n').trim()).length
+end
+set characters to it
+put limit - characters into #character-counter
+
+if characters > limit then
+    set #character-counter's style.color to 'var(--color-text-error)'
+    add [@disabled=] to button
+else
+    set #character-counter's style.color to ''
+    remove @disabled from button
+end
+"""
+
+
+def character_counter_attrs(max_length, submit_button: str) -> dict:
+    """
+    Returns the widget attrs for a live character counter that disables
+    the submit_button (an element ID) once max_length is exceeded.
+    """
+    return {
+        "data-max-length": max_length,
+        "data-submit-button": submit_button,
+        "_": CHARACTER_COUNTER_HYPERSCRIPT,
+    }
@@ -0,0 +1,32 @@
+import pytest
+
+from activities.models import FanOut, FanOutStates
+from users.models import Identity
+
+
+@pytest.mark.django_db
+def test_bulk_insert_raw(identity: Identity, other_identity: Identity):
+    """
+    Tests that raw bulk inserts create FanOuts in their initial state
+    """
+    FanOut.bulk_insert_raw(
+        {
+            "type": FanOut.Types.identity_edited,
+            "identity_id": target.pk,
+            "subject_identity_id": identity.pk,
+        }
+        for target in [identity, other_identity]
+    )
+    fan_outs = FanOut.objects.filter(subject_identity=identity)
+    assert {fan_out.identity_id for fan_out in fan_outs} == {
+        identity.pk,
+        other_identity.pk,
+    }
+    for fan_out in fan_outs:
+        assert fan_out.state == FanOutStates.new
+        assert fan_out.type == FanOut.Types.identity_edited
+        assert fan_out.created is not None
+
+    # An empty iterable inserts nothing
+    FanOut.bulk_insert_raw([])
+    assert fan_outs.count() == 2
@@ -314,6 +314,39 @@ def test_vote_to_ap(identity: Identity, remote_identity: Identity, config_system
     assert data["object"]["inReplyTo"] == post.object_uri
 
 
+@pytest.mark.django_db
+def test_get_post_interactions_includes_votes(
+    identity: Identity, remote_identity: Identity, config_system
+):
+    post = Post.objects.create(
+        author=remote_identity,
+        local=False,
+        content="<p>Test Question</p>",
+        type_data={
+            "type": "Question",
+            "mode": "anyOf",
+            "options": [
+                {"name": "Option 1", "type": "Note", "votes": 0},
+                {"name": "Option 2", "type": "Note", "votes": 0},
+            ],
+            "voter_count": 0,
+            "end_time": format_ld_date(timezone.now() + timedelta(1)),
+        },
+    )
+    post.refresh_from_db()
+
+    PostInteraction.create_votes(post=post, identity=identity, choices=[1])
+
+    interactions = PostInteraction.get_post_interactions([post], identity)
+    assert interactions["vote"] == {post.pk: ["Option 2"]}
+
+    poll = post.type_data.to_mastodon_json(
+        post, identity, votes=interactions["vote"][post.pk]
+    )
+    assert poll["voted"]
+    assert poll["own_votes"] == [1]
+
+
 @pytest.mark.django_db
 def test_handle_add_ap(remote_identity: Identity, config_system):
     post = Post.create_local(
@@ -439,3 +472,41 @@ def test_handle_remove_ap(remote_identity: Identity, config_system):
 
     # Remove activity on unknown post is a no-op
     PostInteraction.handle_remove_ap(data=remove_ap | {"object": "unknown-post"})
+
+
+@pytest.mark.django_db
+def test_get_post_interactions_skips_undone(
+    identity: Identity, remote_identity: Identity, config_system
+):
+    """
+    Tests that undone interactions, votes included, aren't reported
+    """
+    post = Post.objects.create(
+        author=remote_identity,
+        local=False,
+        content="<p>Test Question</p>",
+        type_data={
+            "type": "Question",
+            "mode": "anyOf",
+            "options": [
+                {"name": "Option 1", "type": "Note", "votes": 0},
+                {"name": "Option 2", "type": "Note", "votes": 0},
+            ],
+            "voter_count": 0,
+            "end_time": format_ld_date(timezone.now() + timedelta(1)),
+        },
+    )
+    post.refresh_from_db()
+    PostInteraction.create_votes(post=post, identity=identity, choices=[0])
+    like = PostInteraction.objects.create(
+        identity=identity, post=post, type=PostInteraction.Types.like
+    )
+
+    interactions = PostInteraction.get_post_interactions([post], identity)
+    assert interactions == {"like": {post.pk}, "vote": {post.pk: ["Option 1"]}}
+
+    PostInteraction.transition_perform_queryset(
+        PostInteraction.objects.filter(identity=identity, post=post),
+        PostInteractionStates.undone,
+    )
+    assert PostInteraction.get_post_interactions([post], identity) == {}
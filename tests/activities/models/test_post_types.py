@@ -1,7 +1,15 @@
+import json
+
 import pytest
 
 from activities.models import Post
-from activities.models.post_types import QuestionData
+from activities.models.post_types import (
+    PostTypeDataDecoder,
+    PostTypeDataEncoder,
+    QuestionData,
+    dumps,
+    loads,
+)
 from core.ld import canonicalise
 
 
@@ -67,3 +75,43 @@ def test_question_post(config_system, identity, remote_identity, httpx_mock):
     assert len(question_data.options) == 2
     assert question_data.options[0].votes == 2
     assert question_data.options[1].votes == 1
+
+
+def test_question_data_json_roundtrip():
+    question = QuestionData(
+        type="Question",
+        mode="oneOf",
+        options=[{"name": "Option 1", "votes": 2}, {"name": "Option 2"}],
+        voter_count=2,
+        endTime="2022-12-18T22:03:59Z",
+    )
+
+    encoded = json.dumps(question, cls=PostTypeDataEncoder)
+    decoded = json.loads(encoded, cls=PostTypeDataDecoder)
+
+    assert isinstance(decoded, QuestionData)
+    assert decoded == question
+
+
+def test_question_data_dumps_loads():
+    question = QuestionData(
+        type="Question",
+        mode="anyOf",
+        options=[{"name": "Option 1", "votes": 2}, {"name": "Option 2"}],
+        voter_count=2,
+        endTime="2022-12-18T22:03:59Z",
+    )
+
+    decoded = loads(dumps(question))
+
+    assert isinstance(decoded, QuestionData)
+    assert decoded == question
+
+
+def test_encoder_honours_json_options():
+    data = {"b": 1, "a": 2}
+
+    assert json.dumps(data, cls=PostTypeDataEncoder, sort_keys=True) == '{"a":2,"b":1}'
+    assert json.dumps(data, cls=PostTypeDataEncoder, indent=2) == json.dumps(
+        data, indent=2
+    )
@@ -0,0 +1,157 @@
+import datetime
+
+import pytest
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from activities.models import TimelineEvent
+from music.models import Playlist, PlaylistItem, PlaylistStates
+from music.services.playlist import PlaylistService
+from users.models import Identity
+
+
+@pytest.mark.django_db
+def test_handle_deleted_removes_timeline_events(identity: Identity, monkeypatch):
+    """
+    Tests that a deleted playlist's timeline events are removed in batches,
+    leaving everything else alone
+    """
+    monkeypatch.setattr(Playlist, "TIMELINE_EVENT_DELETE_BATCH_SIZE", 2)
+    playlist = Playlist.objects.create(playlist="gone")
+    other_playlist = Playlist.objects.create(playlist="kept")
+    for _ in range(5):
+        TimelineEvent.objects.create(
+            identity=identity,
+            type=TimelineEvent.Types.playlist,
+            subject_playlist=playlist,
+        )
+    kept_event = TimelineEvent.objects.create(
+        identity=identity,
+        type=TimelineEvent.Types.playlist,
+        subject_playlist=other_playlist,
+    )
+
+    assert PlaylistStates.handle_deleted(playlist) == PlaylistStates.deleted_fanned_out
+    assert not TimelineEvent.objects.filter(subject_playlist=playlist).exists()
+    assert list(TimelineEvent.objects.all()) == [kept_event]
+    # The playlist itself is kept; deleted playlists aren't purged
+    assert Playlist.objects.filter(pk=playlist.pk).exists()
+
+
+@pytest.mark.django_db
+def test_get_delta_readd(identity: Identity):
+    """
+    Tests that a track deleted and then added again ends up on the playlist
+    """
+    playlist = Playlist.objects.create(playlist="readd")
+    service = PlaylistService(playlist)
+    track = dict(
+        identity=identity,
+        type=PlaylistItem.Types.track,
+        name="Track",
+        artist_name="Artist",
+        release_name="Release",
+        isrc="USRC17607839",
+    )
+
+    service.upsert_item_to_playlist(**track)
+    assert [item.isrc for item in playlist.get_delta()] == ["USRC17607839"]
+
+    service.upsert_item_to_playlist(**track, operation="delete")
+    assert playlist.get_delta() == []
+
+    service.upsert_item_to_playlist(**track)
+    assert [item.isrc for item in playlist.get_delta()] == ["USRC17607839"]
+    # The add and delete rows were reused rather than duplicated
+    assert playlist.music_items.count() == 2
+
+
+@pytest.mark.django_db
+def test_tracklist(identity: Identity, django_assert_num_queries):
+    """
+    Tests that the display tracklist leaves out deleted tracks, and uses the
+    prefetched operations without going back to the database
+    """
+    playlist = Playlist.objects.create(playlist="tracklist")
+    for name, operation in [
+        ("Kept", "add"),
+        ("Removed", "add"),
+        ("Removed", "delete"),
+    ]:
+        PlaylistItem.objects.create(
+            playlist=playlist,
+            identity=identity,
+            type=PlaylistItem.Types.track,
+            name=name,
+            operation=operation,
+        )
+
+    assert [item.name for item in playlist.tracklist] == ["Kept"]
+
+    playlist = Playlist.objects.prefetch_related(
+        Prefetch(
+            "music_items",
+            queryset=PlaylistItem.objects.select_related("identity").order_by(
+                "created"
+            ),
+            to_attr="item_operations",
+        )
+    ).get(pk=playlist.pk)
+    with django_assert_num_queries(0):
+        assert [(item.name, item.identity.handle) for item in playlist.tracklist] == [
+            ("Kept", identity.handle)
+        ]
+
+
+@pytest.mark.django_db
+def test_get_delta_order_and_deletes(identity: Identity):
+    """
+    Tests that the delta keeps first-add order, that a later delete wins
+    over an earlier add, and that a datum only replays operations up to it
+    """
+    playlist = Playlist.objects.create(playlist="delta")
+    start = timezone.now() - datetime.timedelta(hours=1)
+    # No ISRCs, so the same track can be added twice (the ISRC constraint
+    # keeps one row per operation)
+    for minutes, (name, operation) in enumerate(
+        [
+            ("A", "add"),
+            ("B", "add"),
+            ("C", "add"),
+            ("B", "delete"),
+            ("A", "add"),
+        ]
+    ):
+        item = PlaylistItem.objects.create(
+            playlist=playlist,
+            identity=identity,
+            type=PlaylistItem.Types.track,
+            name=name,
+            operation=operation,
+        )
+        # created is auto_now_add, so space the operations out afterwards
+        PlaylistItem.objects.filter(pk=item.pk).update(
+            created=start + datetime.timedelta(minutes=minutes)
+        )
+
+    assert [item.name for item in playlist.get_delta()] == ["A", "C"]
+    # Before the delete, the second track was still there
+    assert [
+        item.name for item in playlist.get_delta(start + datetime.timedelta(minutes=2))
+    ] == ["A", "B", "C"]
+
+
+def test_replay_operations():
+    """
+    Tests replaying operations by track key without the database
+    """
+    assert Playlist.replay_operations(
+        [
+            ("a", "add", 1),
+            ("b", "add", 2),
+            ("a", "delete", 3),
+            ("c", "delete", 4),
+            ("b", "add", 5),
+            ("a", "add", 6),
+        ]
+    ) == [5, 6]
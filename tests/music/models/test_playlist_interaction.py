@@ -0,0 +1,180 @@
+import pytest
+
+from activities.models import FanOut, FanOutStates, TimelineEvent
+from music.models import Playlist, PlaylistInteraction, PlaylistInteractionStates
+from music.models.playlist_types import QuestionData
+from users.models import Block, Follow, Identity
+
+
+@pytest.mark.django_db
+def test_boost_fan_out(
+    identity: Identity, other_identity: Identity, remote_identity: Identity
+):
+    """
+    Tests that a local boost fans out to every follower and the booster
+    """
+    Follow.objects.create(source=other_identity, target=identity)
+    Follow.objects.create(source=remote_identity, target=identity)
+    playlist = Playlist.objects.create(playlist="boosted")
+    interaction = PlaylistInteraction.objects.create(
+        identity=identity,
+        playlist=playlist,
+        type=PlaylistInteraction.Types.boost,
+    )
+
+    assert (
+        PlaylistInteractionStates.handle_new(interaction)
+        == PlaylistInteractionStates.fanned_out
+    )
+
+    fan_outs = FanOut.objects.filter(subject_playlist_interaction=interaction)
+    assert {fan_out.identity_id for fan_out in fan_outs} == {
+        identity.pk,
+        other_identity.pk,
+        remote_identity.pk,
+    }
+    for fan_out in fan_outs:
+        assert fan_out.type == FanOut.Types.interaction
+        assert fan_out.subject_playlist_id == playlist.pk
+        assert fan_out.state == FanOutStates.new
+
+
+@pytest.mark.django_db
+def test_handle_undo_ap_deletes_timeline_events(
+    identity: Identity,
+    other_identity: Identity,
+    remote_identity: Identity,
+    django_assert_num_queries,
+):
+    """
+    Tests that undoing a remote like removes its timeline events in one
+    DELETE and leaves events from other interactions alone
+    """
+    playlist = Playlist.objects.create(playlist="undone")
+    interaction = PlaylistInteraction.objects.create(
+        identity=remote_identity,
+        playlist=playlist,
+        type=PlaylistInteraction.Types.like,
+        object_uri="https://remote.test/test-actor/likes/1/",
+        state=PlaylistInteractionStates.fanned_out,
+    )
+    for target in [identity, other_identity]:
+        TimelineEvent.objects.create(
+            identity=target,
+            type=TimelineEvent.Types.liked,
+            subject_playlist=playlist,
+            subject_identity=remote_identity,
+        )
+    kept = TimelineEvent.objects.create(
+        identity=identity,
+        type=TimelineEvent.Types.liked,
+        subject_playlist=playlist,
+        subject_identity=other_identity,
+    )
+
+    with django_assert_num_queries(1):
+        TimelineEvent.delete_playlist_interaction(interaction)
+    assert list(TimelineEvent.objects.filter(subject_playlist=playlist)) == [kept]
+
+    PlaylistInteraction.handle_undo_ap(
+        {
+            "actor": remote_identity.actor_uri,
+            "object": {"id": interaction.object_uri},
+        }
+    )
+    interaction.refresh_from_db()
+    assert interaction.state == PlaylistInteractionStates.undone_fanned_out
+
+
+@pytest.mark.django_db
+def test_get_targets_dedupes_shared_inboxes(
+    identity: Identity, other_identity: Identity, remote_identity: Identity
+):
+    """
+    Tests that a local boost goes to every local follower, one follower per
+    remote shared inbox, every remote follower without one, and nobody the
+    booster has blocked
+    """
+    shared = [
+        Identity.objects.create(
+            actor_uri=f"https://remote.test/shared-{i}/",
+            shared_inbox_uri="https://remote.test/inbox/",
+            username=f"shared{i}",
+            domain=remote_identity.domain,
+            local=False,
+        )
+        for i in range(3)
+    ]
+    blocked = Identity.objects.create(
+        actor_uri="https://remote.test/blocked/",
+        username="blocked",
+        domain=remote_identity.domain,
+        local=False,
+    )
+    for source in [other_identity, remote_identity, blocked, *shared]:
+        Follow.objects.create(source=source, target=identity)
+    Block.objects.create(source=identity, target=blocked, mute=False)
+    playlist = Playlist.objects.create(playlist="targets")
+
+    targets = PlaylistInteraction(
+        identity=identity, playlist=playlist, type=PlaylistInteraction.Types.boost
+    ).get_targets()
+    assert other_identity.pk in targets
+    assert remote_identity.pk in targets
+    assert blocked.pk not in targets
+    assert len(targets & {s.pk for s in shared}) == 1
+    assert len(targets) == 3
+
+    # A remote booster's interaction only goes to local followers
+    targets = PlaylistInteraction(
+        identity=remote_identity,
+        playlist=playlist,
+        type=PlaylistInteraction.Types.boost,
+    ).get_targets()
+    assert targets == set()
+
+
+@pytest.mark.django_db
+def test_create_votes(identity: Identity, monkeypatch):
+    """
+    Tests that duplicate choices make one vote each, and that voting again,
+    or losing a race with a concurrent vote, is refused
+    """
+    playlist = Playlist.objects.create(playlist="poll")
+    # Playlists don't store poll data in this tree, so attach it directly
+    playlist.local = True
+    playlist.type_data = QuestionData(
+        type="Question",
+        mode="anyOf",
+        options=[
+            {"name": "Option 1", "type": "Note"},
+            {"name": "Option 2", "type": "Note"},
+        ],
+        end_time=None,
+    )
+    monkeypatch.setattr(playlist, "calculate_type_data", lambda: None, raising=False)
+
+    votes = PlaylistInteraction.create_votes(playlist, identity, [0, 1, 0])
+    assert sorted(vote.value for vote in votes) == ["Option 1", "Option 2"]
+    assert PlaylistInteraction.objects.filter(playlist=playlist).count() == 2
+
+    with pytest.raises(ValueError):
+        PlaylistInteraction.create_votes(playlist, identity, [1])
+
+    # Another request inserts the same vote between our check and insert
+    PlaylistInteraction.objects.filter(playlist=playlist).delete()
+    bulk_create = PlaylistInteraction.objects.bulk_create
+
+    def racing_bulk_create(objs, **kwargs):
+        PlaylistInteraction.objects.create(
+            identity=identity,
+            playlist=playlist,
+            type=PlaylistInteraction.Types.vote,
+            value="Option 1",
+        )
+        return bulk_create(objs, **kwargs)
+
+    monkeypatch.setattr(PlaylistInteraction.objects, "bulk_create", racing_bulk_create)
+    with pytest.raises(ValueError):
+        PlaylistInteraction.create_votes(playlist, identity, [0])
+    assert not PlaylistInteraction.objects.filter(playlist=playlist).exists()
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from music.models import Playlist, PlaylistInteraction
+from music.models.playlist_types import PlaylistTypeDataEncoder, QuestionData
+from users.models import Identity
+
+
+@pytest.mark.django_db
+def test_question_to_mastodon_json_own_votes(identity: Identity, other_identity):
+    playlist = Playlist.objects.create(playlist="poll")
+    question = QuestionData(
+        type="Question",
+        mode="anyOf",
+        options=[
+            {"name": "Option 1", "votes": 1},
+            {"name": "Option 2", "votes": 0},
+        ],
+        voter_count=1,
+    )
+    PlaylistInteraction.objects.create(
+        identity=identity,
+        playlist=playlist,
+        type=PlaylistInteraction.Types.vote,
+        value="Option 1",
+    )
+
+    value = question.to_mastodon_json(playlist, identity)
+    assert value["voted"] is True
+    assert value["own_votes"] == [0]
+    assert value["votes_count"] == 1
+
+    value = question.to_mastodon_json(playlist, other_identity)
+    assert value["voted"] is False
+    assert value["own_votes"] == []
+
+
+def test_encoder_honours_json_options():
+    data = {"b": 1, "a": 2}
+
+    assert json.dumps(data, cls=PlaylistTypeDataEncoder) == '{"b":1,"a":2}'
+    assert (
+        json.dumps(data, cls=PlaylistTypeDataEncoder, sort_keys=True) == '{"a":2,"b":1}'
+    )
+    assert json.dumps(data, cls=PlaylistTypeDataEncoder, indent=2) == json.dumps(
+        data, indent=2
+    )
+    assert json.dumps(
+        {"a": 1, (1, 2): 3}, cls=PlaylistTypeDataEncoder, skipkeys=True
+    ) == json.dumps({"a": 1, (1, 2): 3}, skipkeys=True)
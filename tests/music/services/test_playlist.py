@@ -0,0 +1,136 @@
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pytest
+
+from activities.models import Post
+from music.models import Playlist, PlaylistItem, PlaylistStates
+from music.models.playlist_item import PlaylistItemStates
+from music.services.playlist import PlaylistService
+from users.models import Identity
+
+
+@pytest.mark.django_db
+def test_deferred_stats(identity: Identity):
+    """
+    Tests that deferred mutations leave the stats alone until
+    recalculate_stats is called
+    """
+    playlist = Playlist.objects.create(playlist="stats")
+    playlist.transition_perform(PlaylistStates.updated)
+    service = PlaylistService(playlist)
+
+    service.like_as(identity)
+    playlist.refresh_from_db()
+    assert playlist.state == PlaylistStates.outdated
+
+    playlist.transition_perform(PlaylistStates.updated)
+    service.unlike_as(identity)
+    playlist.transition_perform(PlaylistStates.updated)
+    service.interact_as(identity, "boost", defer_stats=True)
+    service.uninteract_as(identity, "boost", defer_stats=True)
+    playlist.refresh_from_db()
+    assert playlist.state == PlaylistStates.updated
+
+    service.recalculate_stats()
+    playlist.refresh_from_db()
+    assert playlist.state == PlaylistStates.outdated
+
+
+@pytest.mark.django_db
+def test_bulk_upsert_items(identity: Identity):
+    """
+    Tests that bulk upserts update ISRC matches in place, always add items
+    without an ISRC, and bring undone items back
+    """
+    playlist = Playlist.objects.create(playlist="bulk")
+    service = PlaylistService(playlist)
+    existing = PlaylistItem.objects.create(
+        playlist=playlist,
+        identity=identity,
+        type=PlaylistItem.Types.track,
+        name="Old name",
+        isrc="USRC17607839",
+    )
+    existing.transition_perform(PlaylistItemStates.undone)
+
+    service.bulk_upsert_items(
+        identity,
+        [
+            {"type": "track", "name": "New name", "isrc": "USRC17607839"},
+            {"type": "track", "name": "Untagged", "artist_name": "Artist"},
+            {"type": "track", "name": "Untagged", "artist_name": "Artist"},
+        ],
+    )
+
+    existing.refresh_from_db()
+    assert existing.name == "New name"
+    assert existing.state == PlaylistItemStates.new
+    assert playlist.music_items.filter(isrc__isnull=True).count() == 2
+    assert playlist.music_items.count() == 3
+
+
+@pytest.mark.django_db
+def test_fetch_ancestor_uris(identity: Identity, config_system):
+    """
+    Tests that the recursive ancestor query walks up reply chains, closest
+    first, and stops at the limit. Playlists have no reply columns in this
+    tree yet, so it's driven over posts, which share the same shape.
+    """
+    post1 = Post.create_local(author=identity, content="<p>first</p>")
+    post2 = Post.create_local(author=identity, content="<p>second</p>", reply_to=post1)
+    post3 = Post.create_local(author=identity, content="<p>third</p>", reply_to=post2)
+
+    assert PlaylistService._fetch_ancestor_uris(post3.in_reply_to, 10, model=Post) == [
+        post2.object_uri,
+        post1.object_uri,
+    ]
+    assert PlaylistService._fetch_ancestor_uris(post3.in_reply_to, 1, model=Post) == [
+        post2.object_uri
+    ]
+    assert (
+        PlaylistService._fetch_ancestor_uris("https://missing/", 10, model=Post) == []
+    )
+
+
+def test_walk_descendants():
+    """
+    Tests that the descendant walk is breadth-first, skips repeats, and
+    stops querying once it reaches the limit
+    """
+    nodes = {
+        name: SimpleNamespace(pk=name, object_uri=f"uri:{name}")
+        for name in ["root", "a", "b", "c", "d", "e"]
+    }
+    tree = {
+        "uri:root": [nodes["a"], nodes["b"]],
+        "uri:a": [nodes["c"], nodes["d"], nodes["b"]],
+        "uri:b": [nodes["e"]],
+    }
+    calls = []
+
+    def children_by_parent(level):
+        calls.append([node.pk for node in level])
+        return defaultdict(list, tree)
+
+    walk = PlaylistService._walk_descendants
+    assert [node.pk for node in walk(nodes["root"], children_by_parent, 10)] == [
+        "a",
+        "b",
+        "c",
+        "d",
+        "e",
+    ]
+    calls.clear()
+    assert [node.pk for node in walk(nodes["root"], children_by_parent, 3)] == [
+        "a",
+        "b",
+        "c",
+    ]
+    assert calls == [["root"], ["a", "b"]]
+    calls.clear()
+    assert [node.pk for node in walk(nodes["root"], children_by_parent, 2)] == [
+        "a",
+        "b",
+    ]
+    assert calls == [["root"]]
@@ -0,0 +1,122 @@
+import pytest
+from django.contrib.messages import get_messages
+from django.test.client import Client
+from django.urls import Resolver404, resolve
+
+from activities.models import TimelineEvent
+from music.models import Playlist
+from music.views.playlists.items.upsert import Upsert
+from users.models import Identity
+
+
+@pytest.mark.django_db
+def test_upsert_item_success_message(
+    identity: Identity,
+    client_with_user: Client,
+    config_system,
+    django_capture_on_commit_callbacks,
+):
+    """
+    Tests that adding an item reports success once it's committed
+    """
+    playlist = Playlist.objects.create(playlist="1234")
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client_with_user.post(
+            f"/@{identity.handle}/playlists/{playlist.pk}/upsert",
+            data={
+                "name": "Track",
+                "artist_name": "Artist",
+                "release_name": "Release",
+                "isrc": "USRC17607839",
+            },
+        )
+    assert response.status_code == 302
+    assert playlist.music_items.filter(isrc="USRC17607839").count() == 1
+    assert [str(message) for message in get_messages(response.wsgi_request)] == [
+        "Your playlist_item was created."
+    ]
+
+
+@pytest.mark.django_db
+def test_upsert_items_batch(
+    identity: Identity, client_with_user: Client, config_system
+):
+    """
+    Tests that a JSON batch of items is added in one go, and that an invalid
+    item rejects the whole batch
+    """
+    playlist = Playlist.objects.create(playlist="5678")
+    url = f"/@{identity.handle}/playlists/{playlist.pk}/upsert"
+    items = [
+        {
+            "name": f"Track {number}",
+            "artist_name": "Artist",
+            "release_name": "Release",
+            "isrc": f"USRC1760783{number}",
+        }
+        for number in range(3)
+    ]
+
+    response = client_with_user.post(
+        url,
+        data={"items": [*items, {"name": "No ISRC"}]},
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+    assert list(response.json()["errors"]) == ["3"]
+    assert not playlist.music_items.exists()
+
+    response = client_with_user.post(
+        url, data={"items": items}, content_type="application/json"
+    )
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 3
+    assert set(playlist.music_items.values_list("isrc", flat=True)) == {
+        item["isrc"] for item in items
+    }
+
+
+def test_upsert_route():
+    """
+    Tests that the upsert route resolves to the view lazily, and only
+    matches integer playlist IDs
+    """
+    match = resolve("/@test@example.com/playlists/1234/upsert")
+    assert match.func.view_class is Upsert
+    assert match.kwargs["playlist_id"] == 1234
+    with pytest.raises(Resolver404):
+        resolve("/@test@example.com/playlists/not-a-number/upsert")
+
+
+@pytest.mark.django_db
+def test_upsert_item_timeline_event(
+    identity: Identity,
+    client_with_user: Client,
+    config_system,
+    django_capture_on_commit_callbacks,
+):
+    """
+    Tests that adding an item puts the playlist on the adder's timeline, but
+    only once the item has committed
+    """
+    playlist = Playlist.objects.create(playlist="4321")
+    with django_capture_on_commit_callbacks() as callbacks:
+        client_with_user.post(
+            f"/@{identity.handle}/playlists/{playlist.pk}/upsert",
+            data={
+                "name": "Track",
+                "artist_name": "Artist",
+                "release_name": "Release",
+                "isrc": "USRC17607839",
+            },
+        )
+    events = TimelineEvent.objects.filter(
+        identity=identity,
+        type=TimelineEvent.Types.playlist_item,
+        subject_playlist=playlist,
+    )
+    assert not events.exists()
+
+    for callback in callbacks:
+        callback()
+    assert events.count() == 1